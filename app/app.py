@@ -1,7 +1,10 @@
-from flask import Flask, render_template, request
+import json
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 from datetime import datetime
-from app.risk_metrics import load_valid_tickers, run_portfolio_analysis_web
+from app.risk_metrics import run_portfolio_analysis_web
 from app.ml.pipeline import predict_portfolio as predict
+from app.batch import parse_batch, run_batch
+from app.universe import get_universe
 
 app = Flask(__name__)
 
@@ -44,8 +47,8 @@ def index():
                 return render_template("index.html", error=error, current_date=current_date)
 
         # Validate tickers
-        valid_tickers = set(load_valid_tickers())
-        if not tickers or not all(t in valid_tickers for t in tickers):
+        universe = get_universe()
+        if not universe.contains_all(tickers):
             error = "Please provide valid S&P 500 tickers."
             return render_template("index.html", error=error, current_date=current_date)
 
@@ -71,7 +74,7 @@ def index():
 
             try:
                 result = run_portfolio_analysis_web(
-                    tickers, weights, start_date, end_date
+                    tickers, weights, start_date, end_date, universe=universe
                 )
                 for key in metrics:
                     value = result.get(key)
@@ -114,5 +117,20 @@ def index():
     # GET request: show the input form
     return render_template("index.html", error=error, current_date=current_date)
 
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """
+    JSON batch API: {"portfolios": [{"id", "tickers", "weights", "start_date",
+    "end_date", "metrics"}], "predictions": [{"id", "tickers", "weights"}]}.
+    Streams one NDJSON line per item as soon as it is computed.
+    """
+    universe = get_universe()
+    try:
+        jobs = parse_batch(request.get_json(silent=True), universe)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    lines = (json.dumps(result) + "\n" for result in run_batch(jobs, universe=universe))
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
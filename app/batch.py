@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from app.market_data import get_provider
+from app.risk_metrics import METRICS, portfolio_metrics, portfolio_return_series
+from app.ml.pipeline import fetch_prediction_data, predict_portfolio
+from app.universe import get_universe
+
+MARKET_TICKER = "^GSPC"
+
+
+def _clean(value):
+    """
+    Make a metric value JSON-safe: numpy scalars to floats, NaN/inf to None.
+    """
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    if isinstance(value, (np.integer, np.floating, float)):
+        value = float(value)
+        return value if np.isfinite(value) else None
+    return value
+
+
+def _parse_tickers(spec, valid_tickers):
+    tickers = spec.get("tickers")
+    if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+        raise ValueError("'tickers' must be a list of strings.")
+    tickers = [t.strip().upper() for t in tickers if t.strip()]
+    if not tickers or not all(t in valid_tickers for t in tickers):
+        raise ValueError("Please provide valid S&P 500 tickers.")
+    return tickers
+
+
+def _parse_weights(spec, tickers, required):
+    weights = spec.get("weights")
+    if weights is None and not required:
+        return None
+    try:
+        weights = [float(w) for w in weights]
+    except (TypeError, ValueError):
+        raise ValueError("All weights must be numbers.")
+    if len(weights) != len(tickers):
+        raise ValueError("Please provide the same number of tickers and weights.")
+    if not abs(sum(weights) - 1.0) < 1e-6:
+        raise ValueError("Weights must sum to 1.")
+    return weights
+
+
+def parse_portfolio(spec, valid_tickers):
+    """
+    Validate one portfolio request and return it normalized.
+    Raises ValueError with the same messages as the web form.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Each portfolio must be an object.")
+    tickers = _parse_tickers(spec, valid_tickers)
+    weights = _parse_weights(spec, tickers, required=True)
+    try:
+        start = datetime.strptime(spec.get("start_date"), "%Y-%m-%d")
+        end = datetime.strptime(spec.get("end_date"), "%Y-%m-%d")
+    except Exception:
+        raise ValueError("Invalid date format.")
+    metrics = spec.get("metrics") or list(METRICS)
+    if not isinstance(metrics, list) or not all(isinstance(m, str) for m in metrics):
+        raise ValueError("'metrics' must be a list of strings.")
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(map(str, unknown))}")
+    return {"tickers": tickers, "weights": weights, "start": pd.Timestamp(start), "end": pd.Timestamp(end),
+            "metrics": list(metrics)}
+
+
+def parse_prediction(spec, valid_tickers):
+    """
+    Validate one ML prediction request (tickers, optional weights) and return it normalized.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("Each prediction must be an object.")
+    tickers = _parse_tickers(spec, valid_tickers)
+    return {"tickers": tickers, "weights": _parse_weights(spec, tickers, required=False)}
+
+
+def parse_batch(payload, valid_tickers):
+    """
+    Validate the shape of a batch request and each of its items.
+    Returns a list of jobs (kind, id, parsed spec or None, error or None); items
+    without an id get their position in the batch (portfolios first), so ids are unique.
+    Raises ValueError if the payload itself is malformed.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object.")
+    portfolios = payload.get("portfolios", [])
+    predictions = payload.get("predictions", [])
+    if not isinstance(portfolios, list) or not isinstance(predictions, list):
+        raise ValueError("'portfolios' and 'predictions' must be lists.")
+    if not portfolios and not predictions:
+        raise ValueError("Provide at least one portfolio or prediction.")
+
+    jobs = []
+    for kind, items, parse in (("portfolio", portfolios, parse_portfolio),
+                               ("prediction", predictions, parse_prediction)):
+        for spec in items:
+            i = len(jobs)
+            job_id = spec.get("id", i) if isinstance(spec, dict) else i
+            try:
+                jobs.append((kind, job_id, parse(spec, valid_tickers), None))
+            except ValueError as e:
+                jobs.append((kind, job_id, None, str(e)))
+    return jobs
+
+
+def _fetch_shared_prices(specs, provider):
+    """
+    One bulk download covering every portfolio: the union of tickers over the
+    union of date windows, plus the market index if any portfolio needs beta.
+    """
+    tickers = sorted({t for s in specs for t in s["tickers"]})
+    start = min(s["start"] for s in specs)
+    end = max(s["end"] for s in specs)
+    data = provider.fetch(tickers, start, end, fields=["Adj Close"])
+    prices = data["Adj Close"] if not data.empty else pd.DataFrame()
+    market = None
+    if any("beta" in s["metrics"] for s in specs):
+        market_data = provider.fetch([MARKET_TICKER], start, end, fields=["Close"], auto_adjust=True)
+        if not market_data.empty:
+            market = market_data["Close"].iloc[:, 0].dropna()
+    return prices, market
+
+
+def _run_portfolio(spec, prices, positions, universe, market):
+    columns = positions[universe.ids(spec["tickers"])]
+    if (columns < 0).any():
+        missing = [t for t, c in zip(spec["tickers"], columns) if c < 0]
+        raise ValueError(f"No price data found for {', '.join(missing)}.")
+    in_window = (prices.index >= spec["start"]) & (prices.index < spec["end"])
+    window = prices.iloc[in_window, columns].dropna(axis=0, how="all")
+    port_ret = portfolio_return_series(window, spec["weights"])
+    market_returns = None
+    if market is not None:
+        market_window = market[(market.index >= spec["start"]) & (market.index < spec["end"])]
+        market_returns = market_window.pct_change().dropna()
+    return portfolio_metrics(port_ret, spec["metrics"], market_returns)
+
+
+def run_batch(jobs, provider=None, universe=None):
+    """
+    Run parsed batch jobs and yield one JSON-ready result per job, in order.
+    Price data is downloaded once for all portfolios and once for all
+    predictions; each result is yielded as soon as it is computed.
+    """
+    provider = provider or get_provider()
+    universe = universe or get_universe()
+    portfolio_specs = [spec for kind, _, spec, _ in jobs if kind == "portfolio" and spec]
+    prediction_specs = [spec for kind, _, spec, _ in jobs if kind == "prediction" and spec]
+
+    prices = positions = market = prediction_data = None
+    fetch_errors = {"portfolio": None, "prediction": None}
+    if portfolio_specs:
+        try:
+            prices, market = _fetch_shared_prices(portfolio_specs, provider)
+            positions = universe.column_positions(prices.columns)
+            universe.record_availability(prices)
+        except Exception as e:
+            fetch_errors["portfolio"] = f"Market data error: {e}"
+
+    for kind, job_id, spec, error in jobs:
+        if kind == "prediction" and spec and prediction_data is None and fetch_errors["prediction"] is None:
+            # Portfolios are done: release their prices before loading prediction data
+            prices = positions = market = None
+            try:
+                prediction_data = fetch_prediction_data(
+                    sorted({t for s in prediction_specs for t in s["tickers"]}), provider
+                )
+            except Exception as e:
+                fetch_errors["prediction"] = f"Market data error: {e}"
+        result = {"type": kind, "id": job_id, "error": error}
+        if error is None:
+            try:
+                if fetch_errors[kind] is not None:
+                    raise ValueError(fetch_errors[kind])
+                if kind == "portfolio":
+                    result["metrics"] = _clean(_run_portfolio(spec, prices, positions, universe, market))
+                else:
+                    results, weighted_avg = predict_portfolio(spec["tickers"], spec["weights"],
+                                                              prefetched=prediction_data)
+                    result["results"] = _clean(results)
+                    result["weighted_avg"] = _clean(weighted_avg)
+            except Exception as e:
+                result["error"] = str(e)
+        yield result
@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from app.market_data import SyntheticProvider, set_provider
+
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def make_requests(n, tickers, ml_fraction=0.2, max_assets=5, seed=0):
+    """
+    Build n form posts: VaR portfolios of 1..max_assets tickers with weights
+    summing to 1 over a random 1-3 year window, and ML requests for 1-3 tickers.
+    Returns a list of (mode, form) tuples.
+    """
+    rng = np.random.default_rng(seed)
+    end_max = pd.Timestamp.today().normalize() - pd.DateOffset(days=1)
+    requests = []
+    for _ in range(n):
+        if rng.random() < ml_fraction:
+            chosen = rng.choice(tickers, size=rng.integers(1, min(3, len(tickers)) + 1), replace=False)
+            requests.append(("ml", {"mode": "ml", "tickers[]": ", ".join(chosen), "weights[]": ""}))
+            continue
+        k = int(rng.integers(1, min(max_assets, len(tickers)) + 1))
+        chosen = rng.choice(tickers, size=k, replace=False)
+        weights = np.round(rng.dirichlet(np.ones(k)), 2)
+        weights[-1] = round(1.0 - weights[:-1].sum(), 2)
+        end = end_max - pd.DateOffset(days=int(rng.integers(0, 365)))
+        start = end - pd.DateOffset(days=int(rng.integers(365, 3 * 365)))
+        requests.append(("var", {
+            "mode": "var",
+            "tickers[]": list(chosen),
+            "weights[]": [f"{w:.2f}" for w in weights],
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+        }))
+    return requests
+
+
+def _is_error(status, body):
+    # VaR failures render an alert; ML failures are per-ticker result rows
+    return status != 200 or b"alert-warning" in body or b"table-warning" in body
+
+
+def _inprocess_sender(latency, failure_rate, seed):
+    """
+    Return a send(form) function that posts to the app in-process, with the
+    market data provider replaced by a SyntheticProvider.
+    """
+    from app.app import app
+
+    set_provider(SyntheticProvider(seed=seed, latency=latency, failure_rate=failure_rate))
+    app.testing = True
+
+    def send(form):
+        with app.test_client() as client:
+            response = client.post("/", data=form)
+            return response.status_code, response.data
+
+    return send
+
+
+def _http_sender(url):
+    import requests
+
+    def send(form):
+        response = requests.post(url, data=form, timeout=120)
+        return response.status_code, response.content
+
+    return send
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers, latency=0.0, failure_rate=0.0, seed=0, timeout=60):
+    """
+    Start a local gunicorn serving app.app:app with a synthetic data source.
+    Returns (process, url) once the server answers.
+    """
+    import requests
+
+    port = _free_port()
+    env = dict(os.environ)
+    env["MARKET_DATA_PROVIDER"] = f"synthetic:seed={seed},latency={latency},failure_rate={failure_rate}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.app:app", "-w", str(workers),
+         "-b", f"127.0.0.1:{port}", "--timeout", "120", "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}/"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup.")
+        try:
+            requests.get(url, timeout=5)
+            return proc, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    proc.wait()
+    raise RuntimeError("gunicorn did not start in time.")
+
+
+def run_load(send, requests, concurrency):
+    """
+    Fire the requests at `send` from `concurrency` threads.
+    Returns a list of per-request records and the wall-clock duration.
+    """
+    def one(item):
+        mode, form = item
+        t0 = time.perf_counter()
+        try:
+            status, body = send(form)
+            error = _is_error(status, body)
+        except Exception:
+            status, error = None, True
+        return {"mode": mode, "latency_ms": (time.perf_counter() - t0) * 1000, "status": status, "error": error}
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        records = list(pool.map(one, requests))
+    return records, time.perf_counter() - t0
+
+
+def summarize(records, duration):
+    """
+    Latency percentiles, error rate, throughput and a latency histogram,
+    overall and per mode.
+    """
+    def stats(rows):
+        if not rows:
+            return None
+        lat = np.array([r["latency_ms"] for r in rows])
+        counts, _ = np.histogram(lat, bins=[0] + HISTOGRAM_BUCKETS_MS + [np.inf])
+        return {
+            "count": len(rows),
+            "error_rate": float(np.mean([r["error"] for r in rows])),
+            "mean_ms": float(lat.mean()),
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p95_ms": float(np.percentile(lat, 95)),
+            "p99_ms": float(np.percentile(lat, 99)),
+            "max_ms": float(lat.max()),
+            "throughput_rps": len(rows) / duration if duration > 0 else float("nan"),
+            "histogram": counts.tolist(),
+        }
+
+    summary = {"all": stats(records), "duration_s": duration}
+    for mode in ("var", "ml"):
+        summary[mode] = stats([r for r in records if r["mode"] == mode])
+    return summary
+
+
+def run_sweep(target="inprocess", workers=(1, 2, 4), n_requests=100, users=None, ml_fraction=0.2,
+              tickers=None, latency=0.0, failure_rate=0.0, seed=0, url=None):
+    """
+    Run the same request mix once per worker count and return the run report.
+    For 'inprocess', the worker count is the number of concurrent client threads.
+    For 'gunicorn', a fresh server with that many worker processes is started and
+    driven by `users` client threads (default: twice the worker count).
+    For 'url', an already running server is driven with `workers` client threads.
+    """
+    if tickers is None:
+        from app.risk_metrics import load_valid_tickers
+        tickers = load_valid_tickers()
+    requests = make_requests(n_requests, tickers, ml_fraction=ml_fraction, seed=seed)
+    report = {
+        "target": target,
+        "requests": n_requests,
+        "ml_fraction": ml_fraction,
+        "latency": latency,
+        "failure_rate": failure_rate,
+        "runs": {},
+    }
+    for w in workers:
+        proc = None
+        if target == "inprocess":
+            send, concurrency = _inprocess_sender(latency, failure_rate, seed), w
+        elif target == "gunicorn":
+            proc, server_url = start_gunicorn(w, latency, failure_rate, seed)
+            send, concurrency = _http_sender(server_url), users or 2 * w
+        elif target == "url":
+            send, concurrency = _http_sender(url), w
+        else:
+            raise ValueError(f"Unknown target: {target}")
+        try:
+            try:
+                send(requests[0][1])  # warm-up: imports, template compilation, data cache
+            except Exception:
+                pass  # a failed warm-up is just a failed request; the measured run counts its own errors
+            records, duration = run_load(send, requests, concurrency)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+            if target == "inprocess":
+                set_provider(None)
+        report["runs"][str(w)] = {"concurrency": concurrency, **summarize(records, duration)}
+    return report
+
+
+def max_sustainable_throughput(report, slo_p99_ms=None, max_error_rate=0.01):
+    """
+    Highest throughput across worker counts whose p99 latency and error rate
+    stay within the given limits. Returns (worker count, throughput) or (None, None).
+    """
+    best = (None, None)
+    for w, run in report["runs"].items():
+        stats = run["all"]
+        if stats["error_rate"] > max_error_rate:
+            continue
+        if slo_p99_ms is not None and stats["p99_ms"] > slo_p99_ms:
+            continue
+        if best[1] is None or stats["throughput_rps"] > best[1]:
+            best = (w, stats["throughput_rps"])
+    return best
+
+
+def format_report(report, slo_p99_ms=None):
+    lines = [f"Target: {report['target']}, {report['requests']} requests, ml fraction {report['ml_fraction']}"]
+    header = f"{'workers':>8} {'mode':>5} {'n':>6} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'req/s':>8}"
+    lines.append(header)
+    for w, run in report["runs"].items():
+        for mode in ("all", "var", "ml"):
+            s = run[mode]
+            if s is None:
+                continue
+            lines.append(
+                f"{w:>8} {mode:>5} {s['count']:>6} {100 * s['error_rate']:>6.1f} {s['p50_ms']:>9.1f} "
+                f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f} {s['throughput_rps']:>8.1f}"
+            )
+        edges = ["<" + str(b) for b in HISTOGRAM_BUCKETS_MS] + [">=" + str(HISTOGRAM_BUCKETS_MS[-1])]
+        hist = "  ".join(f"{e}ms:{c}" for e, c in zip(edges, run["all"]["histogram"]) if c)
+        lines.append(f"{'':>8} hist  {hist}")
+    w, rps = max_sustainable_throughput(report, slo_p99_ms)
+    if w is not None:
+        lines.append(f"Max sustainable throughput: {rps:.1f} req/s with {w} workers")
+    else:
+        lines.append("Max sustainable throughput: no worker count met the limits")
+    return "\n".join(lines)
+
+
+def compare_reports(base, new):
+    """
+    Side-by-side p50/p95/p99, error rate and throughput for worker counts
+    present in both runs, with the relative change.
+    """
+    lines = [f"{'workers':>8} {'metric':>15} {'base':>10} {'new':>10} {'change':>8}"]
+    for w in base["runs"]:
+        if w not in new["runs"]:
+            continue
+        b, n = base["runs"][w]["all"], new["runs"][w]["all"]
+        for key in ("p50_ms", "p95_ms", "p99_ms", "error_rate", "throughput_rps"):
+            change = (n[key] - b[key]) / b[key] * 100 if b[key] else float("nan")
+            lines.append(f"{w:>8} {key:>15} {b[key]:>10.2f} {n[key]:>10.2f} {change:>7.1f}%")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the portfolio risk analyzer.")
+    parser.add_argument("--target", choices=["inprocess", "gunicorn", "url"], default="inprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/", help="Server URL for --target url")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to sweep")
+    parser.add_argument("--users", type=int, default=None, help="Client threads for --target gunicorn")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--ml-fraction", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.0, help="Synthetic data latency (seconds)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Synthetic data failure rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slo-p99", type=float, default=None, help="p99 limit (ms) for max throughput")
+    parser.add_argument("--save", help="Write the run report as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two saved runs")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        print(compare_reports(base, new))
+        return
+
+    report = run_sweep(
+        target=args.target,
+        workers=[int(w) for w in args.workers.split(",")],
+        n_requests=args.requests,
+        users=args.users,
+        ml_fraction=args.ml_fraction,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+        url=args.url,
+    )
+    print(format_report(report, args.slo_p99))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved run to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
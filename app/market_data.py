@@ -0,0 +1,232 @@
+import os
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+def _as_list(tickers):
+    if isinstance(tickers, str):
+        return [tickers]
+    return list(tickers)
+
+
+def _select(data, fields, auto_adjust):
+    """
+    Normalize a (field, ticker) column frame: apply auto_adjust and keep only the
+    requested fields, in the requested order.
+    Data saved already adjusted (no 'Adj Close', e.g. from download_multiple)
+    serves its 'Close' when 'Adj Close' is requested.
+    """
+    if data.empty:
+        return data
+    if auto_adjust and "Adj Close" in data.columns.get_level_values(0):
+        data = data.drop(columns="Close", level=0, errors="ignore")
+        data = data.rename(columns={"Adj Close": "Close"}, level=0)
+    if fields is not None:
+        present = data.columns.get_level_values(0)
+        if "Adj Close" in fields and "Adj Close" not in present and "Close" in present:
+            adjusted = data[["Close"]].rename(columns={"Close": "Adj Close"}, level=0)
+            data = pd.concat([data, adjusted], axis=1)
+            present = data.columns.get_level_values(0)
+        data = data[[f for f in fields if f in present]]
+    return data
+
+
+def _combine(frames, fields, auto_adjust):
+    """
+    Combine per-ticker OHLCV frames into one frame with (field, ticker) columns,
+    the same layout yf.download returns for multiple tickers.
+    """
+    frames = {t: df for t, df in frames.items() if not df.empty}
+    if not frames:
+        return pd.DataFrame()
+    data = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+    data.columns.names = ["Price", "Ticker"]
+    data = data.sort_index()
+    return _select(data, fields, auto_adjust)
+
+
+class MarketDataProvider:
+    """
+    Base class for market data sources.
+    Subclasses implement fetch_one() for a single ticker, or override fetch()
+    when the source supports bulk requests.
+    """
+
+    def fetch(self, tickers, start=None, end=None, fields=None, auto_adjust=False):
+        """
+        Fetch daily price data for one or more tickers over [start, end).
+        Returns a DataFrame indexed by date with (field, ticker) columns.
+        With auto_adjust=True, 'Close' holds the adjusted close.
+        """
+        tickers = _as_list(tickers)
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        frames = {}
+        for ticker in tickers:
+            df = self.fetch_one(ticker)
+            if df.empty:
+                continue
+            if start is not None:
+                df = df[df.index >= start]
+            if end is not None:
+                df = df[df.index < end]
+            frames[ticker] = df
+        return _combine(frames, fields, auto_adjust)
+
+    def fetch_one(self, ticker):
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    Live data from Yahoo Finance, fetched in a single bulk yf.download call.
+    """
+
+    def fetch(self, tickers, start=None, end=None, fields=None, auto_adjust=False):
+        import yfinance as yf
+
+        tickers = _as_list(tickers)
+        data = yf.download(tickers, start=start, end=end, auto_adjust=auto_adjust, progress=False)
+        if data is None or data.empty:
+            return pd.DataFrame()
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, tickers[:1]])
+        data.columns.names = ["Price", "Ticker"]
+        return _select(data, fields, auto_adjust=False)
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Replays previously saved data from a folder of per-ticker CSVs, in the
+    layout written by app.ml.data.save_data_to_csv (<folder>/<TICKER>.csv
+    with a 'Date' column). Files are parsed once and kept in memory.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._cache = {}
+
+    def fetch_one(self, ticker):
+        if ticker not in self._cache:
+            path = os.path.join(self.folder, f"{ticker}.csv")
+            if os.path.exists(path):
+                df = pd.read_csv(path, parse_dates=["Date"], index_col="Date")
+                df = df.apply(pd.to_numeric, errors="coerce").sort_index()
+            else:
+                df = pd.DataFrame()
+            self._cache[ticker] = df
+        return self._cache[ticker]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic random-walk prices for load testing and profiling.
+    Each ticker gets its own geometric Brownian motion seeded from its name, so
+    overlapping windows always see the same prices. latency (seconds, plus up
+    to `jitter` more) is added per fetch call, and failure_rate is the chance
+    that a call raises ConnectionError, as a flaky network source would.
+    """
+
+    def __init__(self, seed=0, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 missing=(), epoch="2000-01-03", horizon=None):
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.missing = set(missing)
+        self.epoch = pd.Timestamp(epoch)
+        self.horizon = pd.Timestamp(horizon) if horizon else pd.Timestamp.today().normalize()
+        self._rng = np.random.default_rng(seed)
+        self._cache = {}
+        self._dates = None
+
+    def fetch(self, tickers, start=None, end=None, fields=None, auto_adjust=False):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError("Synthetic market data failure (injected).")
+        return super().fetch(tickers, start, end, fields, auto_adjust)
+
+    def fetch_one(self, ticker):
+        if ticker in self.missing:
+            return pd.DataFrame()
+        if ticker not in self._cache:
+            self._cache[ticker] = self._generate(ticker)
+        return self._cache[ticker]
+
+    def _generate(self, ticker):
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+        if self._dates is None:
+            self._dates = pd.bdate_range(self.epoch, self.horizon)  # slow to build, shared by all tickers
+        dates = self._dates
+        n = len(dates)
+        drift = rng.uniform(-0.0001, 0.0004)
+        vol = rng.uniform(0.01, 0.03)
+        log_ret = rng.normal(drift - 0.5 * vol ** 2, vol, n)
+        close = rng.uniform(20, 500) * np.exp(np.cumsum(log_ret))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        spread = np.abs(rng.normal(0, vol / 2, n))
+        df = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + spread),
+            "Low": np.minimum(open_, close) * (1 - spread),
+            "Close": close,
+            "Adj Close": close,
+            "Volume": rng.lognormal(15, 0.5, n).round(),
+        }, index=dates)
+        df.index.name = "Date"
+        return df
+
+
+_provider = None
+
+
+def provider_from_spec(spec):
+    """
+    Build a provider from a spec string:
+    'yahoo', 'replay:<folder>', 'synthetic[:seed]' or
+    'synthetic:seed=1,latency=0.05,jitter=0.02,failure_rate=0.01'.
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "yahoo":
+        return YahooProvider()
+    if kind == "replay":
+        if not arg:
+            raise ValueError("Replay provider needs a folder, e.g. 'replay:sp500_data'.")
+        return ReplayProvider(arg)
+    if kind == "synthetic":
+        if arg and "=" not in arg:
+            return SyntheticProvider(seed=int(arg))
+        options = dict(opt.split("=", 1) for opt in arg.split(",") if opt)
+        unknown = set(options) - {"seed", "latency", "jitter", "failure_rate"}
+        if unknown:
+            raise ValueError(f"Unknown synthetic provider options: {', '.join(sorted(unknown))}")
+        return SyntheticProvider(
+            seed=int(options.get("seed", 0)),
+            latency=float(options.get("latency", 0.0)),
+            jitter=float(options.get("jitter", 0.0)),
+            failure_rate=float(options.get("failure_rate", 0.0)),
+        )
+    raise ValueError(f"Unknown market data provider: {spec}")
+
+
+def get_provider():
+    """
+    Return the process-wide provider, configured by the MARKET_DATA_PROVIDER
+    environment variable (defaults to Yahoo Finance).
+    """
+    global _provider
+    if _provider is None:
+        _provider = provider_from_spec(os.environ.get("MARKET_DATA_PROVIDER", "yahoo"))
+    return _provider
+
+
+def set_provider(provider):
+    """
+    Replace the process-wide provider (e.g. with a SyntheticProvider in tests).
+    Pass None to fall back to the environment configuration.
+    """
+    global _provider
+    _provider = provider
@@ -1,24 +1,26 @@
-import yfinance as yf
 import pandas as pd
 import os
+from app.market_data import get_provider
 
-def download_data(ticker, start_date, end_date):
+def download_data(ticker, start_date, end_date, provider=None):
     """
-    Download historical price data for a given ticker from Yahoo Finance.
+    Download historical price data for a given ticker from the market data provider.
     Returns a DataFrame with date as index.
     """
-    df = yf.download(ticker, start=start_date, end=end_date, auto_adjust=True)
-    return df
+    return download_multiple([ticker], start_date, end_date, provider=provider).get(ticker, pd.DataFrame())
 
-def download_multiple(tickers, start_date, end_date):
+def download_multiple(tickers, start_date, end_date, provider=None):
     """
-    Download historical price data for multiple tickers.
+    Download historical price data for multiple tickers in one bulk request.
     Returns a dictionary of DataFrames keyed by ticker.
     Skips tickers with no data and prints a warning.
     """
+    provider = provider or get_provider()
+    all_data = provider.fetch(tickers, start_date, end_date, auto_adjust=True)
+    available = set(all_data.columns.get_level_values(1)) if not all_data.empty else set()
     data = {}
     for ticker in tickers:
-        df = download_data(ticker, start_date, end_date)
+        df = all_data.xs(ticker, axis=1, level=1).dropna(how="all") if ticker in available else pd.DataFrame()
         if not df.empty:
             data[ticker] = df
         else:
@@ -1,62 +1,75 @@
+import os
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from app.ml.stream_profile import profile_dataset, load_summary
 
-# Load the master dataset
-df = pd.read_csv("sp500_master_features.csv")
+features_to_plot = [
+    'return_1d', 'volatility_10d', 'ma_5', 'momentum_10d', 'rsi_14', 'macd', 'volume_avg_10d'
+]
+targets_to_plot = [
+    'target_volatility_10d', 'target_max_drawdown_10d', 'target_high_vol', 'target_high_dd'
+]
+
+# Profile the explored columns in one streaming pass; the summary is reused until the dataset changes
+data_path = "sp500_master_features.csv"
+summary_path = "sp500_master_profile.json"
+available = pd.read_csv(data_path, nrows=0).columns
+wanted = ['Date', 'ticker', 'Close'] + features_to_plot + targets_to_plot
+if os.path.exists(summary_path) and os.path.getmtime(summary_path) >= os.path.getmtime(data_path):
+    summary = load_summary(summary_path)
+else:
+    summary = profile_dataset(data_path, summary_path, columns=[c for c in wanted if c in available])
 
 # Basic info and summary
-print("=== DataFrame Info ===")
-print(df.info())
-print("\n=== DataFrame Describe ===")
-print(df.describe(include='all'))
-print("\n=== Head ===")
-print(df.head())
+print(f"=== Rows: {summary['rows']} ===")
+print("\n=== Numeric Columns ===")
+stats = pd.DataFrame({
+    col: {"count": s["count"], "mean": s["mean"], "std": s["std"], "min": s["min"],
+          **{f"{float(q):.0%}": v for q, v in s["quantiles"].items()}, "max": s["max"]}
+    for col, s in summary["columns"].items()
+})
+print(stats)
+print("\n=== Other Columns ===")
+print(pd.DataFrame(summary["categorical"]))
 
 # Check for missing values
 print("\n=== Missing Values (per column) ===")
-print(df.isnull().sum())
+print(pd.Series({col: s["nulls"] for col, s in {**summary["columns"], **summary["categorical"]}.items()}))
 
-# Optionally, drop rows with missing target or features
-# df = df.dropna(subset=['target_volatility_10d', 'return_1d', ...])
 
-# Fill missing values for features (example: forward fill, then back fill)
-df = df.fillna(method='ffill').fillna(method='bfill')
+def plot_histogram(column):
+    hist = summary["columns"][column]["histogram"]
+    plt.figure(figsize=(8, 4))
+    plt.stairs(hist["counts"], hist["edges"], fill=True)
+    outside = hist["underflow"] + hist["overflow"]
+    if outside:  # only with fixed hist_ranges: values left of/right of the plotted range
+        plt.title(f'Distribution of {column} ({hist["underflow"]} below, {hist["overflow"]} above the range)')
+    else:
+        plt.title(f'Distribution of {column}')
+    plt.show()
 
-# Plot distributions for key features
-features_to_plot = [
-    'return_1d', 'volatility_10d', 'ma_5', 'momentum_10d', 'rsi_14', 'macd', 'volume_avg_10d'
-]
-for feature in features_to_plot:
-    if feature in df.columns:
-        plt.figure(figsize=(8, 4))
-        sns.histplot(df[feature].dropna(), bins=100, kde=True)
-        plt.title(f'Distribution of {feature}')
-        plt.show()
-
-# Plot distribution for target variable(s)
-targets_to_plot = [
-    'target_volatility_10d', 'target_max_drawdown_10d', 'target_high_vol', 'target_high_dd'
-]
-for target in targets_to_plot:
-    if target in df.columns:
-        plt.figure(figsize=(8, 4))
-        sns.histplot(df[target].dropna(), bins=100, kde=True)
-        plt.title(f'Distribution of {target}')
-        plt.show()
+
+# Plot distributions for key features and target variable(s)
+for column in features_to_plot + targets_to_plot:
+    if column in summary["columns"]:
+        plot_histogram(column)
 
 # Correlation heatmap for numeric features
+corr = summary["correlation"]
 plt.figure(figsize=(12, 10))
-sns.heatmap(df.corr(numeric_only=True), annot=False, cmap='coolwarm')
+sns.heatmap(pd.DataFrame(np.array(corr["matrix"], dtype=float), index=corr["columns"], columns=corr["columns"]),
+            annot=False, cmap='coolwarm')
 plt.title('Correlation Heatmap')
 plt.show()
 
 # Example: time series plot for a single ticker
-sample_ticker = df['ticker'].iloc[0]
-df_sample = df[df['ticker'] == sample_ticker]
-plt.figure(figsize=(12, 4))
-plt.plot(df_sample['Date'], df_sample['Close'])
-plt.title(f'Close Price Over Time: {sample_ticker}')
-plt.xlabel('Date')
-plt.ylabel('Close')
-plt.show()
\ No newline at end of file
+series = summary["sample_series"]
+if series:
+    plt.figure(figsize=(12, 4))
+    plt.plot(pd.to_datetime(series['Date']), series['Close'])
+    plt.title(f"Close Price Over Time: {series['ticker']}")
+    plt.xlabel('Date')
+    plt.ylabel('Close')
+    plt.show()
@@ -2,7 +2,8 @@ import joblib
 import pandas as pd
 import numpy as np
 import os
-import yfinance as yf
+from app.market_data import get_provider
+from app.universe import get_universe
 
 BASE_DIR = os.path.dirname(__file__)
 
@@ -73,17 +74,41 @@ def compute_macd(series, fast=12, slow=26, signal=9):
     macd_hist = macd - signal_line
     return macd, signal_line, macd_hist
 
-def predict_portfolio(tickers, weights=None):
+def fetch_prediction_data(tickers, provider=None):
+    """
+    Fetch a year of Close/Volume data for all tickers at once, enough for all rolling windows.
+    """
+    provider = provider or get_provider()
+    start = pd.Timestamp.today().normalize() - pd.DateOffset(years=1)
+    return provider.fetch(tickers, start=start, fields=["Close", "Volume"], auto_adjust=True)
+
+def predict_portfolio(tickers, weights=None, provider=None, prefetched=None):
+    # prefetched: optional frame from fetch_prediction_data, shared across several calls
+    fetch_error = None
+    if prefetched is not None:
+        all_data = prefetched
+    else:
+        try:
+            all_data = fetch_prediction_data(tickers, provider)
+        except Exception as e:
+            all_data, fetch_error = pd.DataFrame(), e
+    codes = get_universe().encode(tickers)
     results = []
-    for ticker in tickers:
+    for ticker, code in zip(tickers, codes):
         try:
-            # Fetch more data to ensure all rolling windows are valid
-            data = yf.download(ticker, period="1y", progress=False)
+            if fetch_error is not None:
+                raise fetch_error
+            if not all_data.empty and ticker in all_data.columns.get_level_values(1):
+                data = all_data.xs(ticker, axis=1, level=1).dropna(how="all")
+            else:
+                data = pd.DataFrame()
             if data.empty or len(data) < 60:
                 raise ValueError("Not enough data for " + ticker)
             feats = compute_features(data)
             feats['ticker'] = ticker
-            feats['ticker_encoded'] = le.transform([ticker])[0]
+            if code < 0:
+                raise ValueError(f"{ticker} is not known to the model.")
+            feats['ticker_encoded'] = code
             # Ensure all features are float
             for k in top_features:
                 feats[k] = float(feats[k])
@@ -0,0 +1,327 @@
+import json
+import math
+from collections import Counter
+import numpy as np
+import pandas as pd
+from app.ml.training_data import iter_columns
+
+DEFAULT_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class StreamingProfile:
+    """
+    One-pass, mergeable profile of a dataset read in chunks.
+    Per numeric column it keeps count/nulls/min/max and mean/variance (merged with
+    Chan's parallel formulas), a histogram with a fixed number of bins,
+    and a uniform reservoir sample for approximate quantiles. It also keeps
+    pairwise-complete sums for the covariance/correlation matrix (as DataFrame.corr),
+    value counts for categorical columns, and the Date/Close series of the first ticker.
+    Histogram edges start from the first chunk's range and widen (bins are merged
+    pairwise, so counts stay exact) whenever a later chunk falls outside it;
+    columns in hist_ranges keep fixed edges and count out-of-range values as
+    under/overflow. Profiles can only be merged if their edges match.
+    """
+
+    def __init__(self, bins=100, quantiles=DEFAULT_QUANTILES, sample_size=20_000, hist_ranges=None, seed=0):
+        self.bins = bins
+        self.quantiles = list(quantiles)
+        self.sample_size = sample_size
+        self.hist_ranges = dict(hist_ranges or {})
+        self._rng = np.random.default_rng(seed)
+        self.rows = 0
+        self.numeric = None
+        self.categorical = {}
+        self.dates = {}
+        self.series = None
+
+    def _init_numeric(self, columns, X):
+        k = len(columns)
+        self.numeric = list(columns)
+        self.count = np.zeros(k)
+        self.nulls = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        # Shift for the cross-product sums, to avoid cancellation on large-valued columns
+        with np.errstate(invalid="ignore"):
+            self.shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(k)
+        self.pair_n = np.zeros((k, k))
+        self.pair_sum = np.zeros((k, k))
+        self.pair_sq = np.zeros((k, k))
+        self.pair_prod = np.zeros((k, k))
+        self.edges = []
+        for j, col in enumerate(columns):
+            values = X[:, j][~np.isnan(X[:, j])]
+            lo, hi = self.hist_ranges.get(col, (values.min(), values.max()) if len(values) else (0.0, 1.0))
+            if hi <= lo:
+                hi = lo + 1.0
+            self.edges.append(np.linspace(lo, hi, self.bins + 1))
+        self.hist = np.zeros((k, self.bins))
+        self.underflow = np.zeros(k)
+        self.overflow = np.zeros(k)
+        self.samples = [np.empty(0) for _ in columns]
+        self.seen = np.zeros(k, dtype=np.int64)
+
+    def _sample(self, j, values):
+        """
+        Reservoir sampling (algorithm R), vectorized over the chunk.
+        """
+        sample, seen = self.samples[j], self.seen[j]
+        take = min(max(self.sample_size - len(sample), 0), len(values))
+        if take:
+            sample = np.concatenate([sample, values[:take]])
+            values = values[take:]
+            seen += take
+        if len(values):
+            positions = seen + 1 + np.arange(len(values))
+            slots = (self._rng.random(len(values)) * positions).astype(np.int64)
+            keep = slots < self.sample_size
+            sample[slots[keep]] = values[keep]  # later items overwrite earlier ones, as in the sequential algorithm
+            seen += len(values)
+        self.samples[j], self.seen[j] = sample, seen
+
+    def _widen(self, j, lo, hi):
+        """
+        Double the bin width of column j's histogram (merging adjacent bins) and pad
+        with empty bins until [lo, hi] is covered; the edges stay aligned, so no
+        count is approximated.
+        """
+        edges, counts = self.edges[j], self.hist[j]
+        while lo < edges[0] or hi > edges[-1]:
+            width = 2 * (edges[1] - edges[0])
+            if self.bins % 2:
+                counts = np.append(counts, 0)
+            counts = counts.reshape(-1, 2).sum(axis=1)
+            pad = self.bins - len(counts)
+            if lo >= edges[0]:
+                below = 0
+            elif hi <= edges[0] + len(counts) * width:
+                below = pad
+            else:
+                below = pad // 2
+            counts = np.concatenate([np.zeros(below), counts, np.zeros(pad - below)])
+            edges = edges[0] - below * width + width * np.arange(self.bins + 1)
+        self.edges[j] = edges
+        self.hist[j] = counts
+
+    def update(self, chunk):
+        """
+        Add one chunk (DataFrame) to the profile.
+        """
+        if chunk.empty:
+            return
+        numeric = [c for c in chunk.columns if pd.api.types.is_numeric_dtype(chunk[c])]
+        X = chunk[numeric].to_numpy(dtype=np.float64)
+        if self.numeric is None:
+            self._init_numeric(numeric, X)
+        elif numeric != self.numeric:
+            raise ValueError("All chunks must have the same numeric columns.")
+        self.rows += len(chunk)
+
+        mask = ~np.isnan(X)
+        n = mask.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chunk_mean = np.where(n > 0, np.nansum(X, axis=0) / np.maximum(n, 1), 0.0)
+            chunk_m2 = np.nansum((X - chunk_mean) ** 2, axis=0)
+        self._merge_moments(n, len(chunk) - n, chunk_mean, chunk_m2,
+                            np.nanmin(np.where(mask, X, np.inf), axis=0),
+                            np.nanmax(np.where(mask, X, -np.inf), axis=0))
+
+        Xs = np.where(mask, X - self.shift, 0.0)
+        M = mask.astype(np.float64)
+        self.pair_n += M.T @ M
+        self.pair_sum += Xs.T @ M
+        self.pair_sq += (Xs * Xs).T @ M
+        self.pair_prod += Xs.T @ Xs
+
+        for j in range(len(numeric)):
+            values = X[mask[:, j], j]
+            if numeric[j] not in self.hist_ranges:
+                finite = values[np.isfinite(values)]
+                if len(finite):
+                    self._widen(j, finite.min(), finite.max())
+            edges = self.edges[j]
+            self.hist[j] += np.histogram(values, bins=edges)[0]
+            self.underflow[j] += (values < edges[0]).sum()
+            self.overflow[j] += (values > edges[-1]).sum()
+            self._sample(j, values)
+
+        for col in chunk.columns:
+            if col in numeric:
+                continue
+            values = chunk[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                stats = self.dates.setdefault(col, {"count": 0, "nulls": 0, "min": None, "max": None})
+                stats["count"] += int(values.notna().sum())
+                stats["nulls"] += int(values.isna().sum())
+                lo, hi = values.min(), values.max()
+                if pd.notna(lo):
+                    stats["min"] = lo if stats["min"] is None else min(stats["min"], lo)
+                    stats["max"] = hi if stats["max"] is None else max(stats["max"], hi)
+            else:
+                stats = self.categorical.setdefault(col, {"nulls": 0, "counts": Counter()})
+                stats["nulls"] += int(values.isna().sum())
+                stats["counts"].update(values.dropna().astype(str).value_counts().to_dict())
+
+        if "ticker" in chunk.columns and "Date" in chunk.columns and "Close" in chunk.columns:
+            if self.series is None:
+                self.series = {"ticker": str(chunk["ticker"].iloc[0]), "Date": [], "Close": []}
+            rows = chunk[chunk["ticker"].astype(str) == self.series["ticker"]]
+            self.series["Date"].extend(rows["Date"].astype(str))
+            self.series["Close"].extend(rows["Close"].astype(float))
+
+    def _merge_moments(self, n, nulls, mean, m2, lo, hi):
+        total = self.count + n
+        delta = mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = np.where(total > 0, self.mean + delta * n / np.maximum(total, 1), 0.0)
+            self.m2 = self.m2 + m2 + np.where(total > 0, delta ** 2 * self.count * n / np.maximum(total, 1), 0.0)
+        self.count = total
+        self.nulls = self.nulls + nulls
+        self.min = np.minimum(self.min, lo)
+        self.max = np.maximum(self.max, hi)
+
+    def merge(self, other):
+        """
+        Merge another profile (e.g. of another partition of the data) into this one.
+        """
+        if other.numeric is None:
+            return self
+        if self.numeric is None:
+            raise ValueError("Cannot merge into an empty profile; update it with a chunk first.")
+        if other.numeric != self.numeric or any(not np.array_equal(a, b) for a, b in zip(self.edges, other.edges)):
+            raise ValueError("Profiles must have the same columns and histogram edges (pass hist_ranges).")
+        self.rows += other.rows
+        self._merge_moments(other.count, other.nulls, other.mean, other.m2, other.min, other.max)
+        # Re-center the other profile's pair sums onto this profile's shift
+        d = other.shift - self.shift
+        n, s = other.pair_n, other.pair_sum
+        self.pair_prod += other.pair_prod + d[:, None] * s.T + s * d[None, :] + np.outer(d, d) * n
+        self.pair_sq += other.pair_sq + 2 * d[:, None] * s + d[:, None] ** 2 * n
+        self.pair_sum += s + d[:, None] * n
+        self.pair_n += n
+        self.hist += other.hist
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        for j in range(len(self.numeric)):
+            # Weighted reservoir merge: draw from each side in proportion to the values it has seen
+            a, b = self.samples[j], other.samples[j]
+            total_seen = self.seen[j] + other.seen[j]
+            take_b = self._rng.binomial(min(self.sample_size, len(a) + len(b)), other.seen[j] / max(total_seen, 1))
+            take_b = min(take_b, len(b))
+            take_a = min(len(a), min(self.sample_size, len(a) + len(b)) - take_b)
+            self.samples[j] = np.concatenate([self._rng.permutation(a)[:take_a], self._rng.permutation(b)[:take_b]])
+            self.seen[j] = total_seen
+        for col, stats in other.categorical.items():
+            mine = self.categorical.setdefault(col, {"nulls": 0, "counts": Counter()})
+            mine["nulls"] += stats["nulls"]
+            mine["counts"].update(stats["counts"])
+        for col, stats in other.dates.items():
+            mine = self.dates.setdefault(col, {"count": 0, "nulls": 0, "min": None, "max": None})
+            mine["count"] += stats["count"]
+            mine["nulls"] += stats["nulls"]
+            for key, pick in (("min", min), ("max", max)):
+                if stats[key] is not None:
+                    mine[key] = stats[key] if mine[key] is None else pick(mine[key], stats[key])
+        if self.series is None:
+            self.series = other.series
+        return self
+
+    def correlation(self):
+        """
+        Pairwise-complete covariance and correlation matrices, as DataFrame.cov/corr.
+        """
+        n, s, sq, prod = self.pair_n, self.pair_sum, self.pair_sq, self.pair_prod
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = (prod - s * s.T / n) / (n - 1)
+            var_i = (sq - s ** 2 / n) / (n - 1)  # variance of column i over rows where j is present
+            corr = cov / np.sqrt(var_i * var_i.T)
+        cov[n < 2] = np.nan
+        corr[n < 2] = np.nan
+        return (pd.DataFrame(cov, index=self.numeric, columns=self.numeric),
+                pd.DataFrame(np.clip(corr, -1, 1), index=self.numeric, columns=self.numeric))
+
+    def summary(self):
+        """
+        Compact, JSON-serializable summary of the profile.
+        """
+        def num(x):
+            x = float(x)
+            return x if math.isfinite(x) else None
+
+        columns = {}
+        for j, col in enumerate(self.numeric or []):
+            std = np.sqrt(self.m2[j] / (self.count[j] - 1)) if self.count[j] > 1 else np.nan
+            sample = self.samples[j]
+            quantiles = np.quantile(sample, self.quantiles) if len(sample) else [np.nan] * len(self.quantiles)
+            columns[col] = {
+                "count": int(self.count[j]),
+                "nulls": int(self.nulls[j]),
+                "mean": num(self.mean[j]) if self.count[j] else None,
+                "std": num(std),
+                "min": num(self.min[j]),
+                "max": num(self.max[j]),
+                "quantiles": {str(q): num(v) for q, v in zip(self.quantiles, quantiles)},
+                "histogram": {
+                    "edges": [num(e) for e in self.edges[j]],
+                    "counts": [int(c) for c in self.hist[j]],
+                    "underflow": int(self.underflow[j]),
+                    "overflow": int(self.overflow[j]),
+                },
+            }
+        categorical = {}
+        for col, stats in self.categorical.items():
+            counts = stats["counts"]
+            top = counts.most_common(1)
+            categorical[col] = {
+                "count": int(sum(counts.values())),
+                "nulls": stats["nulls"],
+                "unique": len(counts),
+                "top": top[0][0] if top else None,
+                "freq": int(top[0][1]) if top else 0,
+            }
+        for col, stats in self.dates.items():
+            categorical[col] = {
+                "count": stats["count"],
+                "nulls": stats["nulls"],
+                "min": None if stats["min"] is None else str(stats["min"]),
+                "max": None if stats["max"] is None else str(stats["max"]),
+            }
+        _, corr = self.correlation() if self.numeric else (None, pd.DataFrame())
+        return {
+            "rows": self.rows,
+            "columns": columns,
+            "categorical": categorical,
+            "correlation": {
+                "columns": list(corr.columns),
+                "matrix": [[num(v) for v in row] for row in corr.to_numpy()],
+            },
+            "sample_series": self.series,
+        }
+
+
+def profile_dataset(path, output_path=None, chunksize=100_000, columns=None, **profile_kwargs):
+    """
+    Profile a master dataset (CSV or Parquet) in a single chunked pass and
+    optionally write the summary as JSON to output_path.
+    """
+    if columns is None:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            columns = pq.ParquetFile(path).schema.names
+        else:
+            columns = list(pd.read_csv(path, nrows=0).columns)
+    profile = StreamingProfile(**profile_kwargs)
+    for chunk in iter_columns(path, columns, chunksize):
+        profile.update(chunk)
+    summary = profile.summary()
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(summary, f)
+    return summary
+
+
+def load_summary(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+FEATURES = [
+    'return_1d', 'volatility_10d', 'ma_5', 'momentum_10d', 'rsi_14', 'macd', 'volume_avg_10d',
+    'return_5d', 'return_21d', 'ma_20', 'ma_50', 'momentum_21d', 'volume_avg_21d', 'macd_signal', 'macd_hist'
+]
+TARGET = 'target_volatility_10d'
+
+
+def _dtypes(columns):
+    """
+    Compact dtypes for master dataset columns: categorical ticker, float32 for everything else.
+    """
+    return {c: "category" if c == "ticker" else "float32" for c in columns if c != "Date"}
+
+
+def concat_chunks(chunks):
+    """
+    Concatenate chunks, merging the per-chunk ticker categories (sorted, so the
+    codes match a LabelEncoder fitted on the same tickers).
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    tickers = None
+    if "ticker" in chunks[0].columns:
+        tickers = pd.api.types.union_categoricals([c["ticker"] for c in chunks], sort_categories=True)
+        chunks = [c.drop(columns="ticker") for c in chunks]
+    df = pd.concat(chunks, ignore_index=True)
+    if tickers is not None:
+        df["ticker"] = pd.Categorical(tickers)
+    return df
+
+
+def iter_columns(path, columns, chunksize=100_000):
+    """
+    Yield the given columns of a master dataset (CSV or Parquet) in chunks of
+    about chunksize rows, with compact dtypes.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas().astype(_dtypes(columns))
+    else:
+        parse_dates = ["Date"] if "Date" in columns else None
+        yield from pd.read_csv(path, usecols=columns, dtype=_dtypes(columns), parse_dates=parse_dates,
+                               chunksize=chunksize)
+
+
+def read_columns(path, columns, chunksize=None):
+    """
+    Read only the given columns of a master dataset (CSV or Parquet) with compact dtypes:
+    float32 numbers, categorical 'ticker' (sorted categories) and parsed 'Date'.
+    With chunksize, the file is read in chunks so the full-width frame is never in memory.
+    """
+    if chunksize:
+        return concat_chunks(iter_columns(path, columns, chunksize))[columns]
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=columns).astype(_dtypes(columns))
+    else:
+        parse_dates = ["Date"] if "Date" in columns else None
+        df = pd.read_csv(path, usecols=columns, dtype=_dtypes(columns), parse_dates=parse_dates)
+    return df[columns]
+
+
+def feature_set_hash(path, features, target, extra=None):
+    """
+    Cache key for prepared training data: the feature set, target and the source file's identity.
+    extra (any JSON-serializable value) keys other settings the prepared data depends on.
+    """
+    stat = os.stat(path)
+    key = {
+        "format": 2,  # bumped when the prepared data changes (2: no unused ticker categories)
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "features": list(features),
+        "target": target,
+    }
+    if extra is not None:
+        key["extra"] = extra
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _save_cache(cache_path, X, y, features):
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            X=X[features].to_numpy(dtype=np.float32),
+            y=y.to_numpy(dtype=np.float32),
+            ticker_codes=X["ticker"].cat.codes.to_numpy(),
+            tickers=np.asarray(X["ticker"].cat.categories, dtype=str),
+        )
+    os.replace(tmp_path, cache_path)
+
+
+def _load_cache(cache_path, features, target):
+    with np.load(cache_path) as cached:
+        X = pd.DataFrame(cached["X"], columns=features)
+        X["ticker"] = pd.Categorical.from_codes(cached["ticker_codes"], categories=cached["tickers"])
+        y = pd.Series(cached["y"], name=target)
+    return X, y
+
+
+def load_training_data(path, features=FEATURES, target=TARGET, chunksize=None, cache_dir=None):
+    """
+    Load the model matrices from the master dataset (CSV or Parquet).
+    Reads only the feature, target and ticker columns, drops rows with missing
+    values, and returns X (float32 features plus categorical 'ticker') and y (float32).
+    With cache_dir, the prepared X/y are saved there keyed by feature_set_hash and
+    reused on later runs until the source file or the feature set changes.
+    """
+    features = list(features)
+    cache_path = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{stem}-{feature_set_hash(path, features, target)}.npz")
+        if os.path.exists(cache_path):
+            return _load_cache(cache_path, features, target)
+
+    columns = features + [target, "ticker"]
+    if chunksize:
+        df = concat_chunks(c.dropna(subset=features + [target]) for c in iter_columns(path, columns, chunksize))
+    else:
+        df = read_columns(path, columns).dropna(subset=features + [target])
+    df = df.reset_index(drop=True)
+    # Tickers whose rows were all dropped would keep their category and shift the codes
+    df["ticker"] = df["ticker"].cat.remove_unused_categories()
+    X, y = df[features + ["ticker"]], df[target]
+
+    if cache_path:
+        _save_cache(cache_path, X, y, features)
+    return X, y
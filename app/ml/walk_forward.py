@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import r2_score, root_mean_squared_error
+from app.ml.training_data import FEATURES, TARGET, concat_chunks, feature_set_hash, iter_columns
+
+TICKER_FEATURE = "ticker_encoded"
+
+
+def default_candidates(n_estimators=100, random_state=42):
+    """
+    The two forests features.py compares: without and with the encoded ticker.
+    Each candidate is (estimator, feature columns).
+    """
+    return {
+        "without_ticker": (RandomForestRegressor(n_estimators=n_estimators, random_state=random_state), FEATURES),
+        "with_ticker": (RandomForestRegressor(n_estimators=n_estimators, random_state=random_state),
+                        FEATURES + [TICKER_FEATURE]),
+    }
+
+
+def walk_forward_folds(dates, n_folds=5, min_train_dates=0.5, gap=10):
+    """
+    Expanding-window folds over date-sorted rows.
+    The unique dates after the first min_train_dates (a count, or a fraction of all
+    dates) are split into n_folds consecutive test windows. Each fold trains on
+    every row dated at least `gap` trading dates before its test window, so
+    forward-looking targets (the next 10 days' volatility) never overlap the test period.
+    Returns a list of dicts with row bounds [train_end) and [test_start, test_end) and their dates.
+    """
+    dates = np.asarray(dates)
+    unique = np.unique(dates)
+    if isinstance(min_train_dates, float):
+        min_train_dates = int(len(unique) * min_train_dates)
+    if min_train_dates <= gap or len(unique) - min_train_dates < n_folds:
+        raise ValueError("Not enough dates for the requested folds.")
+    bounds = np.linspace(min_train_dates, len(unique), n_folds + 1).astype(int)
+    rows = np.searchsorted(dates, unique, side="left")
+    rows = np.append(rows, len(dates))
+    folds = []
+    for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        folds.append({
+            "fold": i,
+            "train_end": int(rows[lo - gap]),
+            "test_start": int(rows[lo]),
+            "test_end": int(rows[hi]),
+            "train_last_date": str(unique[lo - gap - 1])[:10],
+            "test_first_date": str(unique[lo])[:10],
+            "test_last_date": str(unique[hi - 1])[:10],
+        })
+    return folds
+
+
+def prepare_fold_data(path, cache_dir=".cache", features=FEATURES, target=TARGET, chunksize=100_000,
+                      n_folds=5, min_train_dates=0.5, gap=10):
+    """
+    Build (or reuse) the date-sorted walk-forward arrays for a master dataset:
+    X.npy (float32 features plus the ticker code), y.npy, dates.npy and folds.json,
+    in a cache directory keyed by feature_set_hash and the fold settings.
+    Returns the directory; workers open its arrays memory-mapped instead of receiving copies.
+    """
+    features = list(features)
+    key = feature_set_hash(path, features, target,
+                           extra={"n_folds": n_folds, "min_train_dates": min_train_dates, "gap": gap})
+    stem = os.path.splitext(os.path.basename(path))[0]
+    fold_dir = os.path.join(cache_dir, f"{stem}-walk-forward-{key}")
+    if os.path.exists(os.path.join(fold_dir, "folds.json")):
+        return fold_dir
+
+    columns = features + [target, "ticker", "Date"]
+    df = concat_chunks(c.dropna(subset=features + [target]) for c in iter_columns(path, columns, chunksize))
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    df["ticker"] = df["ticker"].cat.remove_unused_categories()  # codes must match a LabelEncoder
+    X = np.empty((len(df), len(features) + 1), dtype=np.float32)
+    X[:, :-1] = df[features].to_numpy(dtype=np.float32)
+    X[:, -1] = df["ticker"].cat.codes  # sorted categories, like the LabelEncoder
+    dates = df["Date"].to_numpy(dtype="datetime64[D]")
+    folds = walk_forward_folds(dates, n_folds, min_train_dates, gap)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=".walk-forward-")
+    np.save(os.path.join(tmp_dir, "X.npy"), X)
+    np.save(os.path.join(tmp_dir, "y.npy"), df[target].to_numpy(dtype=np.float32))
+    np.save(os.path.join(tmp_dir, "dates.npy"), dates)
+    with open(os.path.join(tmp_dir, "folds.json"), "w") as f:
+        json.dump({"columns": features + [TICKER_FEATURE], "target": target, "folds": folds}, f)
+    try:
+        os.rename(tmp_dir, fold_dir)
+    except OSError:
+        # Another run built the same key first: use its copy
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(fold_dir, "folds.json")):
+            raise
+    return fold_dir
+
+
+def load_fold_data(fold_dir):
+    """
+    Memory-mapped X and y, the column names and the fold definitions of a prepared directory.
+    """
+    with open(os.path.join(fold_dir, "folds.json")) as f:
+        meta = json.load(f)
+    X = np.load(os.path.join(fold_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(fold_dir, "y.npy"), mmap_mode="r")
+    return X, y, meta["columns"], meta["folds"]
+
+
+def evaluate_fold(fold_dir, fold, name, estimator, features):
+    """
+    Fit one candidate on one fold and score it on the fold's test window.
+    Runs in a worker process: the arrays are opened memory-mapped from fold_dir,
+    so only the estimator and fold bounds are pickled.
+    """
+    X, y, columns, _ = load_fold_data(fold_dir)
+    cols = [columns.index(f) for f in features]
+    X_train, y_train = X[:fold["train_end"]][:, cols], y[:fold["train_end"]]
+    X_test, y_test = X[fold["test_start"]:fold["test_end"]][:, cols], y[fold["test_start"]:fold["test_end"]]
+
+    start = time.perf_counter()
+    model = clone(estimator).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    importances = getattr(model, "feature_importances_", None)
+    return {
+        "model": name,
+        "fold": fold["fold"],
+        "train_last_date": fold["train_last_date"],
+        "test_first_date": fold["test_first_date"],
+        "test_last_date": fold["test_last_date"],
+        "n_train": len(y_train),
+        "n_test": len(y_test),
+        "rmse": root_mean_squared_error(y_test, pred),
+        "r2": r2_score(y_test, pred),
+        "fit_seconds": fit_seconds,
+        "predict_rows_per_sec": len(y_test) / predict_seconds if predict_seconds > 0 else np.inf,
+        "importances": None if importances is None else dict(zip(features, importances.tolist())),
+    }
+
+
+def run_walk_forward(path, candidates=None, cache_dir=".cache", n_folds=5, min_train_dates=0.5, gap=10,
+                     max_workers=None):
+    """
+    Walk-forward evaluation of each candidate ({name: (estimator, features)},
+    default_candidates() if None) over date-ordered folds of the master dataset.
+    All (candidate, fold) fits run in parallel in a process pool sharing the
+    cached, memory-mapped fold arrays; estimators are set to n_jobs=1 so the
+    pool does not oversubscribe the CPUs.
+    Returns (report, importances): per-fold RMSE/R², fit time and inference
+    throughput, and the feature importances per (model, fold) where available.
+    """
+    candidates = candidates or default_candidates()
+    fold_dir = prepare_fold_data(path, cache_dir, n_folds=n_folds, min_train_dates=min_train_dates, gap=gap)
+    _, _, _, folds = load_fold_data(fold_dir)
+
+    jobs = []
+    for name, (estimator, features) in candidates.items():
+        if "n_jobs" in estimator.get_params():
+            estimator = clone(estimator).set_params(n_jobs=1)
+        jobs.extend((fold_dir, fold, name, estimator, list(features)) for fold in folds)
+
+    if max_workers == 1:
+        results = [evaluate_fold(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(evaluate_fold, *zip(*jobs)))
+
+    importances = pd.DataFrame(
+        {(r["model"], r["fold"]): r.pop("importances") for r in results if r["importances"] is not None}
+    ).T
+    for r in results:
+        r.pop("importances", None)
+    return pd.DataFrame(results), importances
+
+
+def summarize_walk_forward(report):
+    """
+    Mean and std of each metric per model, across folds.
+    """
+    metrics = ["rmse", "r2", "fit_seconds", "predict_rows_per_sec"]
+    return report.groupby("model", sort=False)[metrics].agg(["mean", "std"])
@@ -0,0 +1,331 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import linprog, minimize
+from scipy import sparse
+from app.risk_metrics import get_price_data, compute_daily_returns
+
+
+def _moments(returns):
+    returns = returns.dropna()
+    if returns.shape[0] < 2:
+        raise ValueError("Not enough returns to estimate means and covariances.")
+    return returns.mean().to_numpy(), returns.cov().to_numpy()
+
+
+def _solve(K, rhs):
+    try:
+        return np.linalg.solve(K, rhs)
+    except np.linalg.LinAlgError:
+        return np.linalg.lstsq(K, rhs, rcond=None)[0]
+
+
+def _is_singular(cov, rcond=1e-9):
+    """
+    True if the covariance matrix is (numerically) rank-deficient, e.g. with collinear
+    assets or fewer observations than assets. Otherwise every free-asset KKT system
+    of the active set is well-conditioned too (eigenvalue interlacing).
+    """
+    eig = np.linalg.eigvalsh(cov)
+    return eig[0] <= rcond * max(eig[-1], 0.0)
+
+
+def _needs_qp(mu, cov, allow_short=False, rtol=1e-9):
+    """
+    True when the active set and closed forms cannot be used: a singular covariance
+    matrix, or (long-only) several assets tied for the highest mean, where the active
+    set has no unique starting asset and the tied assets would never enter.
+    """
+    if _is_singular(cov):
+        return True
+    return not allow_short and np.count_nonzero(mu >= mu.max() - rtol * np.abs(mu).max()) > 1
+
+
+def _qp_weights(mu, cov, target=None, allow_short=False, w0=None):
+    """
+    Minimum-variance weights, at a target mean return if given, from a general QP solve.
+    Fallback for a singular covariance matrix, where the active set and the closed
+    forms are not well defined. w0 warm-starts the solver.
+    """
+    n = len(mu)
+    # O(1) objective and return constraint, for the solver tolerances
+    scaled = cov / max(np.trace(cov) / n, 1e-300)
+    mu_scale = max(np.abs(mu).max(), 1e-300)
+    constraints = [{"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: np.ones(n)}]
+    if target is not None:
+        constraints.append({"type": "eq", "fun": lambda w: (w @ mu - target) / mu_scale,
+                            "jac": lambda w: mu / mu_scale})
+    res = minimize(lambda w: w @ scaled @ w, np.full(n, 1.0 / n) if w0 is None else w0,
+                   jac=lambda w: 2 * scaled @ w, bounds=None if allow_short else [(0, None)] * n,
+                   constraints=constraints, method="SLSQP", options={"ftol": 1e-12, "maxiter": 1000})
+    feasible = all(abs(c["fun"](res.x)) < 1e-8 for c in constraints) and (allow_short or res.x.min() > -1e-8)
+    if not (res.success or feasible):
+        raise ValueError(f"Mean-variance optimization failed: {res.message}")
+    w = res.x if allow_short else np.clip(res.x, 0, None)
+    return w / w.sum()
+
+
+def _qp_frontier(mu, cov, n_points, allow_short=False, rtol=1e-9):
+    """
+    Frontier weights at n_points target returns from the minimum-variance portfolio
+    up to the highest-mean asset, each QP solve warm-started from the previous point.
+    Targets within rounding of the minimum-variance return (tied means) reuse its weights.
+    """
+    w_min = _qp_weights(mu, cov, allow_short=allow_short)
+    weights = [w_min]
+    for target in np.linspace(mu @ w_min, mu.max(), n_points)[1:]:
+        if target - mu @ w_min <= rtol * np.abs(mu).max():
+            weights.append(w_min)
+        else:
+            weights.append(_qp_weights(mu, cov, target, allow_short, w0=weights[-1]))
+    return np.array(weights)
+
+
+def _corner_portfolios(mu, cov, tol=1e-12):
+    """
+    Corner portfolios of the long-only (w >= 0, sum(w) = 1) mean-variance frontier.
+    Solves min w'Cw - tau * mu'w for tau falling from infinity to 0 with a parametric
+    active set: between events the free-asset KKT system is fixed and the weights
+    move linearly in tau, so each event (a weight reaching 0 or a bound asset's
+    multiplier reaching 0) warm-starts the next segment from the previous one.
+    Returns corner weights ordered from the max-return asset to the min-variance portfolio.
+    """
+    n = len(mu)
+    free = np.zeros(n, dtype=bool)
+    free[np.argmax(mu)] = True
+    tau = np.inf
+    last_changed = None
+    corners = [free.astype(float)]
+    for _ in range(10 * n + 10):
+        F, B = np.flatnonzero(free), np.flatnonzero(~free)
+        m = len(F)
+        # KKT for the free assets: [2 C_FF, -1; 1', 0] [w_F; delta] = [tau mu_F; 1]
+        K = np.zeros((m + 1, m + 1))
+        K[:m, :m] = 2 * cov[np.ix_(F, F)]
+        K[:m, m] = -1
+        K[m, :m] = 1
+        rhs = np.zeros((m + 1, 2))
+        rhs[m, 0] = 1
+        rhs[:m, 1] = mu[F]
+        sol = _solve(K, rhs)
+        a, b = sol[:m, 0], sol[:m, 1]  # w_F = a + b * tau
+        delta_a, delta_b = sol[m]
+        # Multipliers of the bound assets: lambda_B = c + d * tau, must stay >= 0
+        c = 2 * cov[np.ix_(B, F)] @ a - delta_a
+        d = 2 * cov[np.ix_(B, F)] @ b - mu[B] - delta_b
+
+        # Next event below the current tau: a free weight falling to 0 or a multiplier falling to 0
+        event_tau, event = 0.0, None
+        mu_scale = np.abs(mu).max()
+        upper = tau + 1e-9 * (1 + abs(tau))
+        # Slopes are compared with a tolerance relative to their scale (weights per unit tau, multipliers ~ mu)
+        for idx, coef_a, coef_b, leaving, scale in ((F, a, b, True, np.abs(b).max(initial=0.0)),
+                                                    (B, c, d, False, mu_scale)):
+            for i, ca, cb in zip(idx, coef_a, coef_b):
+                if cb <= tol * scale or i == last_changed:
+                    continue
+                t = -ca / cb
+                if event_tau < t <= upper:
+                    event_tau, event = t, (i, leaving)
+
+        w = np.zeros(n)
+        w[F] = np.clip(a + b * event_tau, 0, None)
+        corners.append(w / w.sum())
+        if event is None:
+            break
+        i, leaving = event
+        free[i] = not leaving
+        last_changed = i
+        tau = event_tau
+    return np.array(corners)
+
+
+def _frontier_frame(weights, mu, cov, columns, risk_free_rate):
+    ret = weights @ mu
+    std = np.sqrt(np.clip(np.einsum("pi,ij,pj->p", weights, cov, weights), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, (ret - risk_free_rate) / std, np.nan)
+    frontier = pd.DataFrame({"return": ret, "std": std, "sharpe": sharpe})
+    return frontier, pd.DataFrame(weights, columns=columns)
+
+
+def efficient_frontier(returns, n_points=200, allow_short=False, risk_free_rate=0.0):
+    """
+    Trace the mean-variance efficient frontier for a DataFrame of daily asset returns
+    (as from compute_daily_returns), at n_points target returns from the
+    minimum-variance portfolio up to the highest-mean asset.
+    Long-only frontiers interpolate between corner portfolios found by a
+    warm-started active set; with allow_short=True the frontier is closed form.
+    With a singular covariance matrix (collinear assets, short histories), or
+    long-only with several assets tied for the highest mean, each point is a
+    warm-started QP solve instead.
+    Returns (frontier, weights): daily return, std and Sharpe ratio per point,
+    and the weights per point (one column per asset).
+    """
+    mu, cov = _moments(returns)
+    if _needs_qp(mu, cov, allow_short):
+        weights = _qp_frontier(mu, cov, n_points, allow_short)
+    elif allow_short:
+        inv = _solve(cov, np.column_stack([np.ones_like(mu), mu]))
+        A, Bm, C = inv[:, 0].sum(), inv[:, 1].sum(), mu @ inv[:, 1]
+        D = A * C - Bm ** 2
+        targets = np.linspace(Bm / A, mu.max(), n_points)
+        if abs(D) < 1e-18:  # all assets have the same mean: only the min-variance portfolio is efficient
+            weights = np.tile(inv[:, 0] / A, (n_points, 1))
+        else:
+            weights = (np.outer(C - Bm * targets, inv[:, 0]) + np.outer(A * targets - Bm, inv[:, 1])) / D
+    else:
+        corners = _corner_portfolios(mu, cov)
+        corner_ret = corners @ mu
+        # Corners run from max return down to min variance; interpolate in increasing return
+        corner_ret, corners = corner_ret[::-1], corners[::-1]
+        corner_ret = np.maximum.accumulate(corner_ret)
+        targets = np.linspace(corner_ret[0], corner_ret[-1], n_points)
+        weights = np.column_stack([np.interp(targets, corner_ret, corners[:, j]) for j in range(len(mu))])
+    return _frontier_frame(weights, mu, cov, returns.columns, risk_free_rate)
+
+
+def min_variance_weights(returns, allow_short=False):
+    """
+    Minimum-variance portfolio weights as a Series indexed by asset.
+    """
+    mu, cov = _moments(returns)
+    if _needs_qp(mu, cov, allow_short):
+        w = _qp_weights(mu, cov, allow_short=allow_short)
+    elif allow_short:
+        w = _solve(cov, np.ones_like(mu))
+        w = w / w.sum()
+    else:
+        w = _corner_portfolios(mu, cov)[-1]
+    return pd.Series(w, index=returns.columns)
+
+
+def _qp_tangency(mu, cov, risk_free_rate, allow_short):
+    """
+    Max Sharpe weights for a singular covariance matrix: min y'Cy s.t. (mu - rf)'y = 1
+    (y >= 0 long-only), then w = y / sum(y). Long-only with no asset above the
+    risk-free rate, the best point of the QP frontier is returned instead.
+    """
+    excess = mu - risk_free_rate
+    if not allow_short and excess.max() <= 0:
+        weights = _qp_frontier(mu, cov, 50)
+        std = np.sqrt(np.clip(np.einsum("pi,ij,pj->p", weights, cov, weights), 1e-300, None))
+        return weights[np.argmax((weights @ mu - risk_free_rate) / std)]
+    n = len(mu)
+    scaled = cov / max(np.trace(cov) / n, 1e-300)
+    excess = excess / np.abs(excess).max()  # y is only defined up to scale; keep it O(1)
+    best = np.argmax(excess)
+    y0 = np.zeros(n)
+    y0[best] = 1 / excess[best]
+    constraint = {"type": "eq", "fun": lambda y: y @ excess - 1, "jac": lambda y: excess}
+    res = minimize(lambda y: y @ scaled @ y, y0, jac=lambda y: 2 * scaled @ y,
+                   bounds=None if allow_short else [(0, None)] * n, constraints=[constraint],
+                   method="SLSQP", options={"ftol": 1e-12, "maxiter": 1000})
+    feasible = abs(constraint["fun"](res.x)) < 1e-8 and (allow_short or res.x.min() > -1e-8)
+    if not (res.success or feasible):
+        raise ValueError(f"Mean-variance optimization failed: {res.message}")
+    y = res.x if allow_short else np.clip(res.x, 0, None)
+    if y.sum() <= 0:
+        raise ValueError("No tangency portfolio: every asset's mean return is below the risk-free rate.")
+    return y / y.sum()
+
+
+def max_sharpe_weights(returns, risk_free_rate=0.0, allow_short=False):
+    """
+    Maximum Sharpe ratio (tangency) portfolio weights as a Series indexed by asset.
+    risk_free_rate is daily, as in sharpe_ratio.
+    Long-only: the Sharpe ratio is maximized exactly on each segment between corner portfolios.
+    """
+    mu, cov = _moments(returns)
+    if _needs_qp(mu, cov, allow_short):
+        return pd.Series(_qp_tangency(mu, cov, risk_free_rate, allow_short), index=returns.columns)
+    if allow_short:
+        w = _solve(cov, mu - risk_free_rate)
+        if w.sum() <= 0:
+            raise ValueError("No tangency portfolio: every asset's mean return is below the risk-free rate.")
+        return pd.Series(w / w.sum(), index=returns.columns)
+
+    corners = _corner_portfolios(mu, cov)
+    best_w, best_sharpe = corners[0], -np.inf
+    for w0, w1 in zip(corners[:-1], corners[1:]):
+        dw = w1 - w0
+        m0, m1 = mu @ w0 - risk_free_rate, mu @ dw
+        v0, v1, v2 = w0 @ cov @ w0, w0 @ cov @ dw, dw @ cov @ dw
+        candidates = [0.0, 1.0]
+        denom = m1 * v1 - m0 * v2
+        if abs(denom) > 1e-30:
+            s = (m0 * v1 - m1 * v0) / denom  # where d/ds [m(s) / sqrt(v(s))] = 0
+            if 0 < s < 1:
+                candidates.append(s)
+        for s in candidates:
+            var = v0 + 2 * v1 * s + v2 * s * s
+            if var <= 0:
+                continue
+            sharpe = (m0 + m1 * s) / np.sqrt(var)
+            if sharpe > best_sharpe:
+                best_w, best_sharpe = w0 + s * dw, sharpe
+    return pd.Series(best_w, index=returns.columns)
+
+
+def _min_cvar(R, mu, beta, target, allow_short):
+    """
+    Rockafellar-Uryasev LP: min zeta + sum(u) / ((1 - beta) T)
+    s.t. u_t >= -r_t'w - zeta, u >= 0, sum(w) = 1 and mu'w = target (if given).
+    """
+    T, n = R.shape
+    cost = np.concatenate([np.zeros(n), [1.0], np.full(T, 1.0 / ((1 - beta) * T))])
+    A_ub = sparse.hstack([sparse.csr_matrix(-R), -np.ones((T, 1)), -sparse.identity(T)]).tocsr()
+    b_ub = np.zeros(T)
+    A_eq = [np.concatenate([np.ones(n), [0.0], np.zeros(T)])]
+    b_eq = [1.0]
+    if target is not None:
+        A_eq.append(np.concatenate([mu, [0.0], np.zeros(T)]))
+        b_eq.append(target)
+    w_bounds = (None, None) if allow_short else (0, None)
+    bounds = [w_bounds] * n + [(None, None)] + [(0, None)] * T
+    res = linprog(cost, A_ub=A_ub, b_ub=b_ub, A_eq=np.array(A_eq), b_eq=b_eq, bounds=bounds, method="highs")
+    if not res.success:
+        raise ValueError(f"CVaR optimization failed: {res.message}")
+    return res.x[:n], res.fun
+
+
+def min_cvar_frontier(returns, n_points=20, confidence_level=0.95, allow_short=False):
+    """
+    Trace the mean-CVaR efficient frontier: for n_points target returns from the
+    minimum-CVaR portfolio up to the highest-mean asset, the weights minimizing
+    CVaR of the historical return scenarios (one LP per point).
+    Returns (frontier, weights); 'expected_shortfall' is in return terms (negative
+    for losses), like the ES columns of var_surface.
+    """
+    returns = returns.dropna()
+    if returns.shape[0] < 2:
+        raise ValueError("Not enough returns to estimate CVaR.")
+    R = returns.to_numpy()
+    mu = R.mean(axis=0)
+    w_min, _ = _min_cvar(R, mu, confidence_level, None, allow_short)
+    targets = np.linspace(mu @ w_min, mu.max(), n_points)
+    weights, cvars = [], []
+    for target in targets:
+        w, cvar = _min_cvar(R, mu, confidence_level, target, allow_short)
+        weights.append(w)
+        cvars.append(cvar)
+    frontier = pd.DataFrame({"return": targets, "expected_shortfall": -np.array(cvars)})
+    return frontier, pd.DataFrame(weights, columns=returns.columns)
+
+
+def optimize_portfolio(tickers, start_date, end_date, n_points=200, risk_free_rate=0.0, allow_short=False,
+                       provider=None):
+    """
+    Download prices for the tickers and window, and return the efficient frontier
+    together with minimum-variance and max-Sharpe weights.
+    """
+    prices = get_price_data(tickers, start_date, end_date, provider=provider)
+    if prices.empty:
+        raise ValueError("No price data found for the given date range.")
+    returns = compute_daily_returns(prices)[[t for t in tickers if t in prices.columns]]
+    frontier, weights = efficient_frontier(returns, n_points, allow_short, risk_free_rate)
+    return {
+        "frontier": frontier,
+        "frontier_weights": weights,
+        "min_variance": min_variance_weights(returns, allow_short),
+        "max_sharpe": max_sharpe_weights(returns, risk_free_rate, allow_short),
+    }
@@ -1,8 +1,8 @@
-import yfinance as yf
 import numpy as np
 import pandas as pd
 from scipy.stats import norm
 from datetime import datetime
+from app.market_data import get_provider
 
 def is_trading_period(start: datetime, end: datetime) -> bool:
     """
@@ -19,12 +19,14 @@ def load_valid_tickers(filename="valid_sp500_tickers.txt"):
         tickers = [line.strip() for line in f if line.strip()]
     return tickers
 
-def get_price_data(tickers, start_date, end_date):
+def get_price_data(tickers, start_date, end_date, provider=None):
     """
-    Download price data from Yahoo Finance for the given tickers and date range.
+    Download price data for the given tickers and date range from the market
+    data provider (Yahoo Finance by default).
     Returns the adjusted close prices as a DataFrame.
     """
-    data = yf.download(tickers, start=start_date, end=end_date, auto_adjust=False)
+    provider = provider or get_provider()
+    data = provider.fetch(tickers, start_date, end_date, fields=["Adj Close"])
     adj_close = data['Adj Close'] if 'Adj Close' in data else data
     if isinstance(adj_close, pd.Series):
         adj_close = adj_close.to_frame()
@@ -81,6 +83,71 @@ def monte_carlo_var(portfolio_returns, confidence_level=0.95, num_simulations=10
     simulated_returns = np.random.normal(mean_return, std_return, num_simulations)
     return np.percentile(simulated_returns, (1 - confidence_level) * 100)
 
+def _sorted_tail(sorted_returns, alpha):
+    """
+    VaR (linear-interpolated quantile, as np.percentile) and expected shortfall
+    (mean of returns at or below VaR) for every tail probability in alpha,
+    read off one already sorted array.
+    """
+    n = sorted_returns.size
+    pos = alpha * (n - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, n - 1)
+    var = sorted_returns[lo] + (sorted_returns[hi] - sorted_returns[lo]) * (pos - lo)
+    k = np.maximum(np.searchsorted(sorted_returns, var, side="right"), 1)
+    es = np.cumsum(sorted_returns)[k - 1] / k
+    return var, es
+
+def var_surface(portfolio_returns, confidence_levels=(0.90, 0.95, 0.975, 0.99), horizons=(1, 5, 10),
+                num_simulations=10000, seed=None):
+    """
+    Calculate VaR and expected shortfall (ES) over a grid of confidence levels x horizons (days)
+    for the historical, parametric and Monte Carlo methods in one pass.
+    - Historical: one sort of the daily returns; longer horizons use square-root-of-time scaling.
+    - Parametric: closed form, mean scaled by h and std by sqrt(h).
+    - Monte Carlo: one simulated path of daily returns; h-day returns are the overlapping h-day
+      sums along it, so all horizons share the same draw.
+    At horizon 1 the historical and parametric VaR equal historical_var and parametric_var.
+    Returns a DataFrame indexed by (horizon, confidence).
+    """
+    returns = np.asarray(portfolio_returns, dtype=float)
+    returns = returns[~np.isnan(returns)]
+    if returns.size == 0:
+        raise ValueError("No portfolio returns to compute VaR from.")
+    confidence = np.asarray(confidence_levels, dtype=float)
+    if np.any((confidence <= 0) | (confidence >= 1)):
+        raise ValueError("Confidence levels must be between 0 and 1.")
+    horizons = np.asarray(horizons, dtype=int)
+    if horizons.size == 0 or np.any(horizons < 1):
+        raise ValueError("Horizons must be positive numbers of days.")
+    alpha = 1 - confidence
+    sqrt_h = np.sqrt(horizons)[:, None]
+    h = horizons[:, None]
+
+    # Historical: a single sort serves every confidence level
+    hist_var, hist_es = _sorted_tail(np.sort(returns), alpha)
+
+    # Parametric: normal quantile and tail mean, scaled per horizon
+    mean_return, std_dev = returns.mean(), returns.std()
+    z = norm.ppf(alpha)
+
+    # Monte Carlo: one path long enough for num_simulations windows of the longest horizon
+    rng = np.random.default_rng(seed)
+    mc_std = returns.std(ddof=1) if returns.size > 1 else 0.0  # same std as monte_carlo_var
+    path = np.concatenate([[0.0], np.cumsum(rng.normal(mean_return, mc_std, num_simulations + horizons.max() - 1))])
+    mc = [_sorted_tail(np.sort(path[k:k + num_simulations] - path[:num_simulations]), alpha) for k in horizons]
+
+    surface = {
+        "historical_var": sqrt_h * hist_var,
+        "historical_es": sqrt_h * hist_es,
+        "parametric_var": mean_return * h + z * std_dev * sqrt_h,
+        "parametric_es": mean_return * h - std_dev * sqrt_h * norm.pdf(z) / alpha,
+        "monte_carlo_var": np.array([var for var, _ in mc]),
+        "monte_carlo_es": np.array([es for _, es in mc]),
+    }
+    index = pd.MultiIndex.from_product([horizons, confidence], names=["horizon", "confidence"])
+    return pd.DataFrame({name: values.ravel() for name, values in surface.items()}, index=index)
+
 
 def sharpe_ratio(portfolio_returns, risk_free_rate=0.0):
     """
@@ -109,17 +176,24 @@ def sortino_ratio(portfolio_returns, risk_free_rate=0.0):
     excess_returns = np.mean(portfolio_returns - risk_free_rate)
     return excess_returns / downside_std if downside_std and downside_std != 0 else np.nan
 
-def beta_vs_market(portfolio_returns, market_ticker="^GSPC", start_date=None, end_date=None):
+def beta_vs_market(portfolio_returns, market_ticker="^GSPC", start_date=None, end_date=None, provider=None):
     """
     Calculate the beta of the portfolio vs. the S&P 500.
     Downloads S&P 500 data for the same period.
     """
     if start_date is None or end_date is None:
         return np.nan
-    market_data = yf.download(market_ticker, start=start_date, end=end_date, auto_adjust=True)
+    provider = provider or get_provider()
+    market_data = provider.fetch([market_ticker], start_date, end_date, fields=["Close"], auto_adjust=True)
     if market_data.empty or 'Close' not in market_data:
         return np.nan
     market_returns = market_data['Close'].pct_change().dropna()
+    return beta_from_returns(portfolio_returns, market_returns)
+
+def beta_from_returns(portfolio_returns, market_returns):
+    """
+    Calculate the beta of the portfolio vs. already downloaded market returns.
+    """
     aligned = pd.concat([portfolio_returns, market_returns], axis=1, join='inner').dropna()
     if aligned.shape[0] < 2:
         return np.nan
@@ -127,31 +201,60 @@ def beta_vs_market(portfolio_returns, market_ticker="^GSPC", start_date=None, en
     var = np.var(aligned.iloc[:,1])
     return cov / var if var != 0 else np.nan
 
-def run_portfolio_analysis_web(tickers, weights, start_date, end_date, return_prices=False):
+METRICS = {
+    "volatility": portfolio_volatility,
+    "historical_var": historical_var,
+    "parametric_var": parametric_var,
+    "monte_carlo_var": monte_carlo_var,
+    "sharpe_ratio": sharpe_ratio,
+    "max_drawdown": max_drawdown,
+    "sortino_ratio": sortino_ratio,
+    "beta": None,  # needs market returns, see portfolio_metrics
+}
+
+def portfolio_return_series(prices, weights):
     """
-    Main analysis function for the web app.
-    Returns a dictionary of metrics and (optionally) price/return data.
+    Portfolio daily returns from a price DataFrame.
+    Raises ValueError if there is not enough data.
     """
-    prices = get_price_data(tickers, start_date, end_date)
     if prices.empty:
         raise ValueError("No price data found for the given date range.")
-
-    returns = compute_daily_returns(prices)
-    port_ret = portfolio_returns(returns, weights)
-
+    port_ret = portfolio_returns(compute_daily_returns(prices), weights)
     if port_ret.empty:
         raise ValueError("No portfolio returns computed. Possibly insufficient data.")
+    return port_ret
 
-    result = {
-        "volatility": portfolio_volatility(port_ret),
-        "historical_var": historical_var(port_ret),
-        "parametric_var": parametric_var(port_ret),
-        "monte_carlo_var": monte_carlo_var(port_ret),
-        "sharpe_ratio": sharpe_ratio(port_ret),
-        "max_drawdown": max_drawdown(port_ret),
-        "sortino_ratio": sortino_ratio(port_ret),
-        "beta": beta_vs_market(port_ret, start_date=start_date, end_date=end_date),
-    }
+def portfolio_metrics(port_ret, metrics=None, market_returns=None):
+    """
+    Compute the requested metrics (default: all of METRICS) for a portfolio return series.
+    Beta is computed against market_returns, or NaN if they are not given.
+    """
+    metrics = list(METRICS) if metrics is None else metrics
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+    result = {}
+    for name in metrics:
+        if name == "beta":
+            result[name] = beta_from_returns(port_ret, market_returns) if market_returns is not None else np.nan
+        else:
+            result[name] = METRICS[name](port_ret)
+    return result
+
+def run_portfolio_analysis_web(tickers, weights, start_date, end_date, return_prices=False, provider=None,
+                               universe=None):
+    """
+    Main analysis function for the web app.
+    Returns a dictionary of metrics and (optionally) price/return data.
+    If a TickerUniverse is given, the tickers' data availability is recorded in it.
+    """
+    prices = get_price_data(tickers, start_date, end_date, provider=provider)
+    if universe is not None:
+        universe.record_availability(prices)
+    port_ret = portfolio_return_series(prices, weights)
+
+    result = portfolio_metrics(port_ret, [m for m in METRICS if m != "beta"])
+    result["beta"] = beta_vs_market(port_ret, start_date=start_date, end_date=end_date, provider=provider)
 
     if return_prices:
         result["prices"] = prices
@@ -1,42 +1,173 @@
+import os
+import random
+import secrets
+import stat
+import threading
 import pandas as pd
-import yfinance as yf
 import time
+from concurrent.futures import ThreadPoolExecutor
+from app.market_data import get_provider
+from app.risk_metrics import load_valid_tickers
+from app.universe import DEFAULT_TICKERS_FILE
 
+UNIVERSE_FILE = DEFAULT_TICKERS_FILE  # the file get_universe() reloads, wherever this runs from
 
-def scrape_sp500_valid_tickers():
-    # Scrape the S&P 500 tickers from Wikipedia
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average,
+    with bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def scrape_sp500_tickers():
+    """
+    Scrape the S&P 500 tickers from Wikipedia, in Yahoo format (BRK.B → BRK-B).
+    """
     url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+    df = pd.read_html(url)[0]
+    # Clean up tickers (some might have dots or special chars like BRK.B)
+    return [t.replace('.', '-') for t in df['Symbol'].tolist()]
+
+
+def _fetch_with_retry(provider, batch, start, limiter, retries, backoff):
+    """
+    Fetch one batch of tickers, waiting for the rate limiter before every attempt
+    and backing off exponentially (with jitter) after failures.
+    A batch without a single price counts as a failed attempt: yf.download reports
+    rate limits and network errors as empty/all-NaN frames instead of raising.
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            data = provider.fetch(batch, start=start, fields=["Close"])
+            if data.empty or not data.notna().to_numpy().any():
+                raise ConnectionError("no prices returned for the whole batch")
+            return data
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+
+def validate_tickers(tickers, provider=None, batch_size=50, max_workers=4, rate=2.0, retries=3,
+                     backoff=0.5, lookback_days=7):
+    """
+    Check which tickers have recent price data, using multi-ticker requests of
+    batch_size tickers on a pool of max_workers threads, limited to `rate`
+    requests per second.
+    Returns (valid, invalid, failed): tickers with data, tickers without data, and
+    tickers whose batch still failed (or had no data at all) after all retries (status unknown).
+    """
+    provider = provider or get_provider()
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=lookback_days)
+    limiter = TokenBucket(rate, capacity=max_workers)
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+    def check(batch):
+        try:
+            data = _fetch_with_retry(provider, batch, start, limiter, retries, backoff)
+        except Exception as e:
+            print(f"❌ batch {batch[0]}..{batch[-1]} failed after {retries + 1} attempts: {e}")
+            return batch, None
+        closes = data["Close"]
+        return batch, set(closes.columns[closes.notna().any()])
+
+    valid, invalid, failed = [], [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for batch, with_data in pool.map(check, batches):
+            if with_data is None:
+                failed.extend(batch)
+                continue
+            for t in batch:
+                (valid if t in with_data else invalid).append(t)
+    return valid, invalid, failed
+
+
+def write_universe(tickers, filename=UNIVERSE_FILE):
+    """
+    Write the tickers file atomically: readers (and the universe registry) see
+    either the old file or the complete new one. The file keeps its permissions,
+    or gets the umask default (like open()) if it is new.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    tmp_path = os.path.join(directory, f".tickers-{secrets.token_hex(8)}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
     try:
-        df = pd.read_html(url)[0]
-    except Exception as e:
-        print("Failed to fetch S&P 500 tickers:", e)
-        return
+        with os.fdopen(fd, "w") as f:
+            if os.path.exists(filename):
+                os.fchmod(f.fileno(), stat.S_IMODE(os.stat(filename).st_mode))
+            for t in tickers:
+                f.write(t + "\n")
+        os.replace(tmp_path, filename)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-    tickers = df['Symbol'].tolist()
 
-    # Clean up tickers (some might have dots or special chars like BRK.B)
-    tickers = [t.replace('.', '-') for t in tickers]  # e.g., BRK.B → BRK-B
+def diff_universe(old, new):
+    """
+    Tickers added to and removed from the universe, in their original order.
+    """
+    old_set, new_set = set(old), set(new)
+    return [t for t in new if t not in old_set], [t for t in old if t not in new_set]
 
-    # Validate each ticker using yfinance
-    valid_tickers = []
-    for t in tickers:
+
+def scrape_sp500_valid_tickers(provider=None, tickers=None, filename=UNIVERSE_FILE, max_removed_fraction=0.1,
+                               **validate_kwargs):
+    """
+    Refresh the universe file: scrape the S&P 500 list (unless tickers are given),
+    validate it in concurrent batches, write the file atomically and report the
+    diff against the previous universe. Tickers whose batch failed keep their
+    previous status, so a flaky data source does not shrink the universe, and a
+    refresh that would remove more than max_removed_fraction of the previous
+    universe is not written.
+    """
+    if tickers is None:
         try:
-            hist = yf.Ticker(t).history(period="1d")
-            if not hist.empty:
-                valid_tickers.append(t)
-                print(f"✅ {t}")
-            else:
-                print(f"❌ {t} (no data)")
+            tickers = scrape_sp500_tickers()
         except Exception as e:
-            print(f"❌ {t} (error: {e})")
-        time.sleep(0.3)  # polite delay to avoid being rate-limited :)
+            print("Failed to fetch S&P 500 tickers:", e)
+            return None
+
+    previous = load_valid_tickers(filename) if os.path.exists(filename) else []
+    valid, invalid, failed = validate_tickers(tickers, provider=provider, **validate_kwargs)
+    kept = set(valid) | (set(failed) & set(previous))
+    universe = [t for t in tickers if t in kept]
+    added, removed = diff_universe(previous, universe)
 
-    # Save to a txt file
-    with open("valid_sp500_tickers.txt", "w") as f:
-        for t in valid_tickers:
-            f.write(t + "\n")
+    if previous and len(removed) > max_removed_fraction * len(previous):
+        print(f"Refusing to write '{filename}': {len(removed)} of {len(previous)} tickers would be removed "
+              f"(limit {max_removed_fraction:.0%}).")
+        return None
+    write_universe(universe, filename)
 
-    print(f"\nSaved {len(valid_tickers)} valid tickers to 'valid_sp500_tickers.txt'.")
+    print(f"✅ {len(valid)} valid, ❌ {len(invalid)} without data, ⚠️ {len(failed)} failed to validate")
+    if added:
+        print(f"Added: {', '.join(added)}")
+    if removed:
+        print(f"Removed: {', '.join(removed)}")
+    print(f"\nSaved {len(universe)} valid tickers to '{filename}'.")
+    return {"universe": universe, "added": added, "removed": removed, "invalid": invalid, "failed": failed}
 
 if __name__ == "__main__":
     scrape_sp500_valid_tickers()
@@ -0,0 +1,121 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from app.risk_metrics import load_valid_tickers
+
+DEFAULT_TICKERS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "valid_sp500_tickers.txt")
+
+
+class TickerUniverse:
+    """
+    In-memory index of the valid ticker universe.
+    Each ticker gets a dense integer id (its position in the tickers file), its
+    code in the model's label encoder (-1 if the model has not seen it) and the
+    first/last dates it has had data in any price frame recorded so far (by the
+    web form and the batch API). Lookups for lists of tickers are vectorized hash lookups.
+    """
+
+    def __init__(self, tickers, encoder_classes=(), mtime=None):
+        self.tickers = np.array(list(dict.fromkeys(tickers)), dtype=object)
+        self.mtime = mtime
+        self._index = pd.Index(self.tickers)
+        self._encoder_index = pd.Index(list(encoder_classes))
+        self.encoder_codes = self._encoder_index.get_indexer(self._index)
+        self.first_date = np.full(len(self.tickers), np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.last_date = self.first_date.copy()
+        self._lock = threading.Lock()  # guards the availability dates, updated from request threads
+
+    @classmethod
+    def from_file(cls, filename, encoder_classes=()):
+        mtime = os.stat(filename).st_mtime_ns  # before reading, so a concurrent write triggers another reload
+        return cls(load_valid_tickers(filename), encoder_classes, mtime=mtime)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._index
+
+    def ids(self, tickers):
+        """
+        Dense ids for a list of tickers, -1 for tickers outside the universe.
+        """
+        return self._index.get_indexer(list(tickers))
+
+    def contains_all(self, tickers):
+        return bool(len(tickers)) and bool((self.ids(tickers) >= 0).all())
+
+    def encode(self, tickers):
+        """
+        Label-encoder codes for a list of tickers (as LabelEncoder.transform), -1 if unseen.
+        """
+        return self._encoder_index.get_indexer(list(tickers))
+
+    def column_positions(self, columns):
+        """
+        Map ids to positions in a shared matrix with the given ticker columns.
+        Returns an array indexed by id (-1 where the matrix has no column for that ticker),
+        so positions for any portfolio are positions[universe.ids(tickers)].
+        """
+        positions = np.full(len(self.tickers), -1)
+        ids = self.ids(columns)
+        found = ids >= 0
+        positions[ids[found]] = np.flatnonzero(found)
+        return positions
+
+    def record_availability(self, prices):
+        """
+        Widen the known first/last data dates using a price frame with ticker columns.
+        """
+        if prices.empty:
+            return
+        ids = self.ids(prices.columns)
+        valid = prices.notna().to_numpy()
+        has_data = valid.any(axis=0) & (ids >= 0)
+        dates = prices.index.to_numpy(dtype="datetime64[ns]")
+        first = dates[valid.argmax(axis=0)][has_data]
+        last = dates[len(dates) - 1 - valid[::-1].argmax(axis=0)][has_data]
+        ids = ids[has_data]
+        with self._lock:
+            self.first_date[ids] = np.where(np.isnat(self.first_date[ids]), first,
+                                            np.minimum(self.first_date[ids], first))
+            self.last_date[ids] = np.where(np.isnat(self.last_date[ids]), last, np.maximum(self.last_date[ids], last))
+
+    def info(self, ticker):
+        i = self._index.get_loc(ticker)
+        first, last = self.first_date[i], self.last_date[i]
+        return {
+            "id": i,
+            "encoder_code": int(self.encoder_codes[i]),
+            "first_date": None if np.isnat(first) else pd.Timestamp(first),
+            "last_date": None if np.isnat(last) else pd.Timestamp(last),
+        }
+
+
+_universes = {}
+_lock = threading.Lock()
+
+
+def _encoder_classes():
+    # Imported lazily: the pipeline module loads the model and encoder at import time
+    from app.ml.pipeline import le
+    return le.classes_
+
+
+def get_universe(filename=DEFAULT_TICKERS_FILE):
+    """
+    Return the process-wide universe for a tickers file, built on first use.
+    When the file's mtime changes, a new universe is built and swapped in whole,
+    so concurrent readers always see either the old or the new one.
+    """
+    path = os.path.abspath(filename)
+    mtime = os.stat(path).st_mtime_ns
+    universe = _universes.get(path)
+    if universe is None or universe.mtime != mtime:
+        with _lock:
+            universe = _universes.get(path)
+            if universe is None or universe.mtime != mtime:
+                universe = TickerUniverse.from_file(path, _encoder_classes())
+                _universes[path] = universe
+    return universe
@@ -0,0 +1,38 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.ml.training_data import FEATURES, TARGET
+
+
+@pytest.fixture
+def make_master_csv(tmp_path):
+    """
+    Factory for small master dataset CSVs: make(dates, tickers, ...) returns (path, frame).
+    Rows are grouped by ticker like the real dataset unless grouped=False, which
+    gives one row per date with a random ticker. Features are standard normal
+    unless scales maps them to a (mean, std); nans maps a column to how many of
+    its values are blanked out; columns selects and orders the written columns.
+    """
+    def make(dates, tickers, grouped=True, columns=None, scales=None, nans=None, seed=0, name="master.csv"):
+        rng = np.random.default_rng(seed)
+        dates = pd.DatetimeIndex(dates).strftime("%Y-%m-%d")
+        if grouped:
+            df = pd.DataFrame({"Date": np.tile(dates, len(tickers)), "ticker": np.repeat(tickers, len(dates))})
+        else:
+            df = pd.DataFrame({"Date": dates, "ticker": rng.choice(tickers, len(dates))})
+        n = len(df)
+        df[FEATURES] = rng.normal(size=(n, len(FEATURES)))
+        for col, (mean, std) in (scales or {}).items():
+            df[col] = mean + std * df[col]
+        df["macd"] = 0.5 * df["return_1d"] + rng.normal(0, 0.01, n)
+        df[TARGET] = 0.01 + 0.002 * df["volatility_10d"] + rng.normal(0, 0.001, n)
+        df["Close"] = rng.uniform(10, 100, n)
+        if columns is not None:
+            df = df[columns].copy()
+        for col, count in (nans or {}).items():
+            df.loc[rng.choice(n, count, replace=False), col] = np.nan
+        path = tmp_path / name
+        df.to_csv(path, index=False)
+        return str(path), df
+    return make
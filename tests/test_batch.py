@@ -0,0 +1,120 @@
+import json
+import pytest
+import numpy as np
+
+from app.app import app
+from app.batch import parse_batch, run_batch
+from app.market_data import SyntheticProvider, set_provider
+from app.risk_metrics import run_portfolio_analysis_web
+
+VALID = {"AAPL", "MSFT", "GOOG", "AMZN"}
+
+
+class CountingProvider(SyntheticProvider):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def fetch(self, tickers, *args, **kwargs):
+        self.calls.append(list(tickers))
+        return super().fetch(tickers, *args, **kwargs)
+
+
+def portfolio(tickers, weights, start="2023-01-01", end="2024-01-01", **extra):
+    return {"tickers": tickers, "weights": weights, "start_date": start, "end_date": end, **extra}
+
+# --- parse_batch tests ---
+
+def test_parse_batch_rejects_malformed():
+    with pytest.raises(ValueError):
+        parse_batch([1, 2], VALID)
+    with pytest.raises(ValueError):
+        parse_batch({"portfolios": "AAPL"}, VALID)
+    with pytest.raises(ValueError):
+        parse_batch({}, VALID)
+
+def test_parse_batch_item_errors():
+    jobs = parse_batch({"portfolios": [
+        portfolio(["AAPL"], [1.0], id="ok"),
+        portfolio(["FAKE"], [1.0]),
+        portfolio(["AAPL", "MSFT"], [0.5, 0.4]),
+        portfolio(["AAPL"], [1.0], start="2024/01/01"),
+        portfolio(["AAPL"], [1.0], metrics=["alpha"]),
+    ]}, VALID)
+    assert [job[1] for job in jobs] == ["ok", 1, 2, 3, 4]
+    errors = [job[3] for job in jobs]
+    assert errors[0] is None
+    assert errors[1] == "Please provide valid S&P 500 tickers."
+    assert errors[2] == "Weights must sum to 1."
+    assert errors[3] == "Invalid date format."
+    assert "alpha" in errors[4]
+
+def test_parse_batch_malformed_metrics():
+    jobs = parse_batch({"portfolios": [
+        portfolio(["AAPL"], [1.0], metrics=5),
+        portfolio(["AAPL"], [1.0], metrics=[["x"]]),
+    ]}, VALID)
+    assert [job[3] for job in jobs] == ["'metrics' must be a list of strings."] * 2
+
+def test_parse_batch_default_ids_unique():
+    jobs = parse_batch({"portfolios": [portfolio(["AAPL"], [1.0])], "predictions": [{"tickers": ["MSFT"]}]}, VALID)
+    assert [(job[0], job[1]) for job in jobs] == [("portfolio", 0), ("prediction", 1)]
+
+# --- run_batch tests ---
+
+def test_run_batch_fetches_shared_data_once():
+    provider = CountingProvider()
+    jobs = parse_batch({
+        "portfolios": [
+            portfolio(["AAPL", "MSFT"], [0.5, 0.5]),
+            portfolio(["GOOG"], [1.0], start="2022-01-01", metrics=["volatility", "beta"]),
+            portfolio(["AMZN", "AAPL"], [0.3, 0.7], metrics=["sharpe_ratio"]),
+        ],
+        "predictions": [{"tickers": ["AAPL", "MSFT"], "weights": [0.5, 0.5]}, {"tickers": ["GOOG"]}],
+    }, VALID)
+    results = list(run_batch(jobs, provider))
+    assert [r["error"] for r in results] == [None] * 5
+    # one fetch for portfolio prices, one for the market index, one for predictions
+    assert len(provider.calls) == 3
+    assert set(results[1]["metrics"]) == {"volatility", "beta"}
+    assert results[3]["weighted_avg"] is not None
+
+def test_run_batch_matches_single_analysis():
+    provider = CountingProvider()
+    jobs = parse_batch({"portfolios": [
+        portfolio(["AAPL", "MSFT"], [0.5, 0.5], start="2023-03-01", end="2023-09-01"),
+        portfolio(["GOOG"], [1.0], start="2022-01-01", end="2024-01-01"),
+    ]}, VALID)
+    batch = list(run_batch(jobs, provider))[0]["metrics"]
+    single = run_portfolio_analysis_web(["AAPL", "MSFT"], [0.5, 0.5], "2023-03-01", "2023-09-01", provider=provider)
+    for key in ("volatility", "historical_var", "parametric_var", "sharpe_ratio", "max_drawdown", "beta"):
+        assert np.isclose(batch[key], single[key])
+
+def test_run_batch_fetch_failure_reported_per_item():
+    jobs = parse_batch({"portfolios": [portfolio(["AAPL"], [1.0]), portfolio(["MSFT"], [1.0])]}, VALID)
+    results = list(run_batch(jobs, SyntheticProvider(failure_rate=1.0)))
+    assert all(r["error"].startswith("Market data error") for r in results)
+
+# --- /api/batch endpoint ---
+
+def test_batch_endpoint_streams_ndjson():
+    set_provider(CountingProvider())
+    try:
+        client = app.test_client()
+        response = client.post("/api/batch", json={
+            "portfolios": [portfolio(["AAPL"], [1.0], id="a"), portfolio(["FAKE"], [1.0], id="b")],
+            "predictions": [{"id": "c", "tickers": ["MSFT"]}],
+        })
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    finally:
+        set_provider(None)
+    assert [(r["type"], r["id"]) for r in lines] == [("portfolio", "a"), ("portfolio", "b"), ("prediction", "c")]
+    assert lines[0]["error"] is None and "historical_var" in lines[0]["metrics"]
+    assert lines[1]["error"] == "Please provide valid S&P 500 tickers."
+
+def test_batch_endpoint_bad_request():
+    response = app.test_client().post("/api/batch", data="not json")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
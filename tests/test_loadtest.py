@@ -0,0 +1,68 @@
+import numpy as np
+
+from app.loadtest import (
+    compare_reports,
+    make_requests,
+    max_sustainable_throughput,
+    run_sweep,
+    summarize,
+)
+
+TICKERS = ["AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "JPM"]
+
+# --- make_requests tests ---
+
+def test_make_requests_mix():
+    requests = make_requests(200, TICKERS, ml_fraction=0.25, seed=1)
+    assert len(requests) == 200
+    modes = [mode for mode, _ in requests]
+    assert 0.1 < modes.count("ml") / len(modes) < 0.4
+    for mode, form in requests:
+        assert form["mode"] == mode
+        if mode == "var":
+            assert len(form["tickers[]"]) == len(form["weights[]"])
+            assert abs(sum(float(w) for w in form["weights[]"]) - 1.0) < 1e-6
+            assert form["start_date"] < form["end_date"]
+
+def test_make_requests_few_tickers():
+    requests = make_requests(50, TICKERS[:2], ml_fraction=0.5, max_assets=5, seed=2)
+    for mode, form in requests:
+        chosen = form["tickers[]"] if mode == "var" else form["tickers[]"].split(", ")
+        assert 1 <= len(chosen) <= 2
+
+def test_make_requests_deterministic():
+    assert make_requests(20, TICKERS, seed=3) == make_requests(20, TICKERS, seed=3)
+
+# --- summarize tests ---
+
+def test_summarize_percentiles():
+    records = [{"mode": "var", "latency_ms": float(i), "status": 200, "error": i % 10 == 0} for i in range(1, 101)]
+    summary = summarize(records, duration=2.0)
+    assert np.isclose(summary["all"]["p50_ms"], 50.5)
+    assert np.isclose(summary["all"]["error_rate"], 0.1)
+    assert np.isclose(summary["all"]["throughput_rps"], 50.0)
+    assert sum(summary["all"]["histogram"]) == 100
+    assert summary["ml"] is None
+
+def test_max_sustainable_throughput():
+    def run(p99, err, rps):
+        return {"all": {"p99_ms": p99, "error_rate": err, "throughput_rps": rps}}
+    report = {"runs": {"1": run(100, 0.0, 10), "2": run(150, 0.0, 18), "4": run(900, 0.0, 25), "8": run(120, 0.5, 40)}}
+    assert max_sustainable_throughput(report, slo_p99_ms=500) == ("2", 18)
+    assert max_sustainable_throughput(report) == ("4", 25)
+
+# --- end-to-end in-process run ---
+
+def test_run_sweep_inprocess():
+    report = run_sweep(workers=[2], n_requests=6, ml_fraction=0.5, tickers=TICKERS)
+    stats = report["runs"]["2"]["all"]
+    assert stats["count"] == 6
+    assert stats["error_rate"] == 0.0
+    assert "p99_ms" in compare_reports(report, report)
+
+def test_run_sweep_counts_failures():
+    report = run_sweep(workers=[1], n_requests=4, ml_fraction=1.0, tickers=TICKERS, failure_rate=1.0)
+    assert report["runs"]["1"]["ml"]["error_rate"] == 1.0
+    # A failing VaR warm-up does not abort the sweep
+    report = run_sweep(workers=[1], n_requests=4, ml_fraction=0.0, tickers=TICKERS, failure_rate=1.0)
+    assert report["runs"]["1"]["var"]["error_rate"] == 1.0
@@ -0,0 +1,83 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.market_data import (
+    ReplayProvider,
+    SyntheticProvider,
+    get_provider,
+    provider_from_spec,
+    set_provider,
+    YahooProvider,
+)
+from app.ml.data import download_multiple, save_data_to_csv
+from app.risk_metrics import get_price_data
+
+# --- SyntheticProvider tests ---
+
+def test_synthetic_layout():
+    provider = SyntheticProvider(horizon="2024-12-31")
+    data = provider.fetch(["AAA", "BBB"], "2024-06-03", "2024-06-10")
+    assert isinstance(data.columns, pd.MultiIndex)
+    assert set(data.columns.get_level_values(1)) == {"AAA", "BBB"}
+    assert "Adj Close" in data.columns.get_level_values(0)
+    assert data.index.min() >= pd.Timestamp("2024-06-03")
+    assert data.index.max() < pd.Timestamp("2024-06-10")
+
+def test_synthetic_deterministic_across_windows():
+    a = SyntheticProvider(seed=1, horizon="2024-12-31").fetch(["AAA"], "2024-01-01", "2024-12-31", fields=["Close"])
+    b = SyntheticProvider(seed=1, horizon="2024-12-31").fetch(["AAA"], "2024-06-03", "2024-06-10", fields=["Close"])
+    assert np.allclose(a.loc[b.index].values, b.values)
+
+def test_synthetic_fields_and_auto_adjust():
+    data = SyntheticProvider(horizon="2024-12-31").fetch(
+        ["AAA"], "2024-06-03", "2024-06-10", fields=["Close", "Volume"], auto_adjust=True
+    )
+    assert list(data.columns.get_level_values(0)) == ["Close", "Volume"]
+
+def test_synthetic_failure_injection():
+    provider = SyntheticProvider(failure_rate=1.0, horizon="2024-12-31")
+    with pytest.raises(ConnectionError):
+        provider.fetch(["AAA"], "2024-06-03", "2024-06-10")
+
+def test_synthetic_missing_ticker():
+    provider = SyntheticProvider(missing=["BBB"], horizon="2024-12-31")
+    data = provider.fetch(["AAA", "BBB"], "2024-06-03", "2024-06-10")
+    assert set(data.columns.get_level_values(1)) == {"AAA"}
+
+# --- ReplayProvider tests ---
+
+def test_replay_roundtrip(tmp_path):
+    source = SyntheticProvider(horizon="2024-12-31")
+    original = source.fetch(["AAA"], "2024-06-03", "2024-07-01")
+    save_data_to_csv({"AAA": original.xs("AAA", axis=1, level=1)}, str(tmp_path))
+    replayed = ReplayProvider(str(tmp_path)).fetch(["AAA", "ZZZ"], "2024-06-03", "2024-07-01")
+    assert set(replayed.columns.get_level_values(1)) == {"AAA"}
+    assert np.allclose(replayed["Close"]["AAA"].values, original["Close"]["AAA"].values)
+
+def test_replay_of_adjusted_download_serves_adj_close(tmp_path):
+    source = SyntheticProvider(horizon="2024-12-31")
+    save_data_to_csv(download_multiple(["AAA", "BBB"], "2024-06-03", "2024-07-01", provider=source), str(tmp_path))
+    prices = get_price_data(["AAA", "BBB"], "2024-06-03", "2024-07-01", provider=ReplayProvider(str(tmp_path)))
+    expected = source.fetch(["AAA", "BBB"], "2024-06-03", "2024-07-01", fields=["Adj Close"])["Adj Close"]
+    assert list(prices.columns) == ["AAA", "BBB"]
+    assert np.allclose(prices.values, expected.values)
+
+# --- provider selection tests ---
+
+def test_provider_from_spec():
+    assert isinstance(provider_from_spec("yahoo"), YahooProvider)
+    assert isinstance(provider_from_spec("replay:sp500_data"), ReplayProvider)
+    assert provider_from_spec("synthetic:7").seed == 7
+    synthetic = provider_from_spec("synthetic:seed=2,latency=0.05,failure_rate=0.1")
+    assert (synthetic.seed, synthetic.latency, synthetic.failure_rate) == (2, 0.05, 0.1)
+    with pytest.raises(ValueError):
+        provider_from_spec("bloomberg")
+
+def test_get_provider_env(monkeypatch):
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "synthetic:3")
+    set_provider(None)
+    try:
+        assert get_provider().seed == 3
+    finally:
+        set_provider(None)
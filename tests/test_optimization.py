@@ -0,0 +1,152 @@
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from app.market_data import SyntheticProvider
+from app.optimization import (
+    efficient_frontier,
+    max_sharpe_weights,
+    min_cvar_frontier,
+    min_variance_weights,
+    optimize_portfolio,
+)
+
+
+def make_returns(n_assets, n_days=500, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(size=(n_days, 3)) @ rng.normal(size=(3, n_assets)) * 0.005
+    drift = rng.normal(0.0004, 0.0003, n_assets)
+    data = rng.normal(0, 0.01, (n_days, n_assets)) + factors + drift
+    return pd.DataFrame(data, columns=[f"T{i}" for i in range(n_assets)])
+
+
+def reference_min_variance(returns, target=None):
+    mu, cov = returns.mean().values, returns.cov().values
+    n = len(mu)
+    constraints = [{"type": "eq", "fun": lambda w: w.sum() - 1}]
+    if target is not None:
+        constraints.append({"type": "eq", "fun": lambda w: w @ mu - target})
+    res = minimize(lambda w: w @ cov @ w, np.ones(n) / n, bounds=[(0, None)] * n,
+                   constraints=constraints, method="SLSQP", options={"ftol": 1e-15, "maxiter": 500})
+    return np.sqrt(res.fun)
+
+# --- mean-variance frontier tests ---
+
+def test_long_only_frontier_matches_reference():
+    returns = make_returns(8)
+    frontier, weights = efficient_frontier(returns, n_points=25)
+    assert (weights.values >= -1e-12).all()
+    assert np.allclose(weights.sum(axis=1), 1)
+    assert (np.diff(frontier["return"]) >= -1e-15).all()
+    for i in [0, 8, 16, 24]:
+        assert np.isclose(frontier["std"][i], reference_min_variance(returns, frontier["return"][i]), rtol=1e-5)
+
+def test_short_frontier_closed_form():
+    returns = make_returns(6)
+    frontier, weights = efficient_frontier(returns, n_points=10, allow_short=True)
+    mu = returns.mean().values
+    assert np.allclose(weights.values @ mu, frontier["return"])
+    assert np.allclose(weights.sum(axis=1), 1)
+    # Short-selling can only lower the variance for the same target return
+    long_frontier, _ = efficient_frontier(returns, n_points=10)
+    assert frontier["std"].iloc[0] <= long_frontier["std"].iloc[0] + 1e-12
+
+def test_min_variance_weights():
+    returns = make_returns(8)
+    w = min_variance_weights(returns)
+    cov = returns.cov().values
+    assert list(w.index) == list(returns.columns)
+    assert np.isclose(np.sqrt(w.values @ cov @ w.values), reference_min_variance(returns), rtol=1e-5)
+    w_short = min_variance_weights(returns, allow_short=True)
+    inv_ones = np.linalg.solve(cov, np.ones(8))
+    assert np.allclose(w_short.values, inv_ones / inv_ones.sum())
+
+def test_max_sharpe_weights():
+    returns = make_returns(8)
+    mu, cov = returns.mean().values, returns.cov().values
+    frontier, _ = efficient_frontier(returns, n_points=500)
+    w = max_sharpe_weights(returns).values
+    sharpe = (w @ mu) / np.sqrt(w @ cov @ w)
+    assert (w >= -1e-12).all() and np.isclose(w.sum(), 1)
+    assert sharpe >= frontier["sharpe"].max() - 1e-9
+    w_short = max_sharpe_weights(returns, allow_short=True).values
+    assert (w_short @ mu) / np.sqrt(w_short @ cov @ w_short) >= sharpe - 1e-12
+
+def collinear_returns():
+    # The highest-mean asset is duplicated (up to 1e-10 noise) and another is an exact multiple:
+    # the covariance matrix is singular
+    returns = make_returns(8)
+    best = returns.mean().idxmax()
+    noise = np.random.default_rng(1).normal(0, 1e-10, len(returns))
+    return returns.assign(DUP=returns[best] + noise, LEV=2 * returns["T0"])
+
+def test_collinear_assets_match_reference():
+    returns = collinear_returns()
+    cov = returns.cov().values
+    w = min_variance_weights(returns).values
+    assert (w >= -1e-12).all() and np.isclose(w.sum(), 1)
+    assert np.isclose(np.sqrt(w @ cov @ w), reference_min_variance(returns), rtol=1e-4)
+    frontier, weights = efficient_frontier(returns, n_points=9)
+    assert np.allclose(weights.sum(axis=1), 1)
+    for i in [0, 4, 8]:
+        assert np.isclose(frontier["std"][i], reference_min_variance(returns, frontier["return"][i]), rtol=1e-4)
+
+def test_collinear_assets_max_sharpe():
+    returns = collinear_returns()
+    mu, cov = returns.mean().values, returns.cov().values
+    w = max_sharpe_weights(returns).values
+    frontier, _ = efficient_frontier(returns, n_points=50)
+    assert (w >= -1e-12).all() and np.isclose(w.sum(), 1)
+    assert (w @ mu) / np.sqrt(w @ cov @ w) >= frontier["sharpe"].max() - 1e-6
+
+def test_tied_means_match_reference():
+    # All means equal: every asset is tied for the highest mean
+    returns = make_returns(6)
+    returns = returns - returns.mean() + 0.0005
+    cov = returns.cov().values
+    w = min_variance_weights(returns).values
+    assert np.sqrt(w @ cov @ w) <= reference_min_variance(returns) * (1 + 1e-4)
+    # Two assets tied for the highest mean
+    returns = make_returns(6)
+    means = returns.mean()
+    returns["T1"] += means.max() - means["T1"]
+    frontier, _ = efficient_frontier(returns, n_points=9)
+    for i in [0, 4, 8]:
+        assert frontier["std"][i] <= reference_min_variance(returns, frontier["return"][i]) * (1 + 1e-4)
+    w = max_sharpe_weights(returns).values
+    assert (w @ returns.mean().values) / np.sqrt(w @ returns.cov().values @ w) >= frontier["sharpe"].max() - 1e-6
+
+def test_frontier_speed_50_assets():
+    returns = make_returns(50, n_days=750)
+    t0 = time.perf_counter()
+    frontier, weights = efficient_frontier(returns, n_points=200)
+    assert time.perf_counter() - t0 < 1.0
+    assert weights.shape == (200, 50)
+
+def test_not_enough_returns():
+    with pytest.raises(ValueError):
+        efficient_frontier(make_returns(3, n_days=1))
+
+# --- min-CVaR frontier tests ---
+
+def test_min_cvar_frontier():
+    returns = make_returns(5, n_days=300)
+    frontier, weights = min_cvar_frontier(returns, n_points=5)
+    assert np.allclose(weights.sum(axis=1), 1)
+    assert (weights.values >= -1e-9).all()
+    # Asking for more return can only make the shortfall worse
+    assert (np.diff(frontier["expected_shortfall"]) <= 1e-12).all()
+    port = returns.values @ weights.values[0]
+    var = np.percentile(port, 5)
+    assert np.isclose(frontier["expected_shortfall"][0], port[port <= var].mean(), rtol=0.05)
+
+# --- optimize_portfolio ---
+
+def test_optimize_portfolio_synthetic():
+    result = optimize_portfolio(["AAPL", "MSFT", "GOOG"], "2022-01-01", "2024-01-01", n_points=50,
+                                provider=SyntheticProvider(horizon="2024-12-31"))
+    assert result["frontier"].shape == (50, 3)
+    assert list(result["max_sharpe"].index) == ["AAPL", "MSFT", "GOOG"]
+    assert np.isclose(result["min_variance"].sum(), 1)
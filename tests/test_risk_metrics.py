@@ -9,7 +9,11 @@ from app.risk_metrics import (
     load_valid_tickers,
     get_price_data,
     portfolio_returns,
+    historical_var,
+    parametric_var,
+    var_surface,
 )
+from app.market_data import SyntheticProvider
 
 # --- compute_daily_returns tests ---
 
@@ -60,32 +64,36 @@ def test_load_valid_tickers_custom(tmp_path):
 
 # --- get_price_data tests ---
 
-def test_get_price_data_valid(monkeypatch):
-    # Mock yfinance download
-    import app.risk_metrics as rm
-    def mock_download(tickers, start, end, **kwargs):
-        dates = pd.date_range(start, end)
-        data = pd.DataFrame(
-            {t: np.linspace(100, 110, len(dates)) for t in tickers},
-            index=dates
-        )
-        return data
-    monkeypatch.setattr(rm, "yf", type("yf", (), {"download": staticmethod(mock_download)}))
+def test_get_price_data_valid():
+    # Mock market data provider
+    class MockProvider:
+        def fetch(self, tickers, start, end, **kwargs):
+            dates = pd.date_range(start, end)
+            data = pd.DataFrame(
+                {t: np.linspace(100, 110, len(dates)) for t in tickers},
+                index=dates
+            )
+            return data
     tickers = ["AAPL", "MSFT"]
     start = "2024-06-01"
     end = "2024-06-10"
-    df = get_price_data(tickers, start, end)
+    df = get_price_data(tickers, start, end, provider=MockProvider())
     assert set(df.columns) == set(tickers)
     assert len(df) > 0
 
-def test_get_price_data_empty(monkeypatch):
-    import app.risk_metrics as rm
-    def mock_download(tickers, start, end, **kwargs):
-        return pd.DataFrame()
-    monkeypatch.setattr(rm, "yf", type("yf", (), {"download": staticmethod(mock_download)}))
-    df = get_price_data(["FAKE"], "2024-06-01", "2024-06-10")
+def test_get_price_data_empty():
+    class MockProvider:
+        def fetch(self, tickers, start, end, **kwargs):
+            return pd.DataFrame()
+    df = get_price_data(["FAKE"], "2024-06-01", "2024-06-10", provider=MockProvider())
     assert df.empty
 
+def test_get_price_data_synthetic():
+    df = get_price_data(["AAPL", "MSFT"], "2024-06-03", "2024-06-15",
+                        provider=SyntheticProvider(horizon="2024-12-31"))
+    assert list(df.columns) == ["AAPL", "MSFT"]
+    assert len(df) == 10  # business days in [start, end)
+
 # --- portfolio_returns tests ---
 
 def test_portfolio_returns_basic():
@@ -110,4 +118,37 @@ def test_portfolio_returns_empty():
     returns = pd.DataFrame()
     weights = []
     port_ret = portfolio_returns(returns, weights)
-    assert port_ret.empty
\ No newline at end of file
+    assert port_ret.empty
+
+# --- var_surface tests ---
+
+def test_var_surface_matches_single_metrics():
+    rets = pd.Series(np.random.default_rng(0).normal(0.0005, 0.01, 500))
+    surface = var_surface(rets, confidence_levels=[0.9, 0.95, 0.99], horizons=[1, 5], seed=1)
+    assert surface.shape == (6, 6)
+    for c in [0.9, 0.95, 0.99]:
+        assert np.isclose(surface.loc[(1, c), "historical_var"], historical_var(rets, c))
+        assert np.isclose(surface.loc[(1, c), "parametric_var"], parametric_var(rets, c))
+        assert np.isclose(surface.loc[(1, c), "historical_es"], rets[rets <= historical_var(rets, c)].mean())
+
+def test_var_surface_scaling_and_ordering():
+    rets = pd.Series(np.random.default_rng(1).normal(0.0, 0.01, 1000))
+    surface = var_surface(rets, horizons=[1, 4], num_simulations=50000, seed=2)
+    # Zero-mean normal: the 4-day VaR is about twice the 1-day VaR for every method
+    for method in ["historical_var", "parametric_var", "monte_carlo_var"]:
+        ratio = surface.loc[4, method].values / surface.loc[1, method].values
+        assert np.allclose(ratio, 2.0, rtol=0.1)
+    # ES is beyond VaR, and both grow with confidence
+    for method in ["historical", "parametric", "monte_carlo"]:
+        assert (surface[f"{method}_es"] <= surface[f"{method}_var"]).all()
+        assert (surface.loc[1, f"{method}_var"].diff().dropna() < 0).all()
+    assert np.allclose(surface["monte_carlo_var"], surface["parametric_var"], rtol=0.1)
+
+def test_var_surface_invalid():
+    rets = pd.Series([0.01, -0.02, 0.005])
+    with pytest.raises(ValueError):
+        var_surface(rets, confidence_levels=[1.5])
+    with pytest.raises(ValueError):
+        var_surface(rets, horizons=[0])
+    with pytest.raises(ValueError):
+        var_surface(pd.Series(dtype=float))
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import pandas as pd
+
+from app.market_data import SyntheticProvider
+from app.risk_metrics import load_valid_tickers
+from app.universe import DEFAULT_TICKERS_FILE
+from app.scrape_sp500_tickers import (
+    UNIVERSE_FILE,
+    TokenBucket,
+    diff_universe,
+    scrape_sp500_valid_tickers,
+    validate_tickers,
+    write_universe,
+)
+
+TICKERS = [f"T{i:03d}" for i in range(40)]
+
+
+class FlakyProvider(SyntheticProvider):
+    """
+    Synthetic data that fails the first `failures` calls for every batch starting with one of `flaky`.
+    """
+
+    def __init__(self, flaky=(), failures=1, empty=False, **kwargs):
+        super().__init__(**kwargs)
+        self.flaky = set(flaky)
+        self.failures = failures
+        self.empty = empty
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch(self, tickers, *args, **kwargs):
+        with self._lock:
+            self.calls.append(list(tickers))
+            attempts = sum(1 for c in self.calls if c[0] == tickers[0])
+        if tickers[0] in self.flaky and attempts <= self.failures:
+            if self.empty:  # like yf.download on a rate limit: no exception, no prices
+                return pd.DataFrame()
+            raise ConnectionError("flaky")
+        return super().fetch(tickers, *args, **kwargs)
+
+# --- TokenBucket tests ---
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    t0 = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - t0 >= 0.09  # 5 waits of 1/50 s after the initial token
+
+# --- validate_tickers tests ---
+
+def test_validate_tickers_batches():
+    provider = FlakyProvider(missing=["T003", "T017"])
+    valid, invalid, failed = validate_tickers(TICKERS, provider=provider, batch_size=10, rate=1000)
+    assert invalid == ["T003", "T017"]
+    assert valid == [t for t in TICKERS if t not in invalid]
+    assert failed == []
+    assert len(provider.calls) == 4
+    assert all(len(c) == 10 for c in provider.calls)
+
+def test_validate_tickers_retries_with_backoff():
+    provider = FlakyProvider(flaky=["T010"], failures=2)
+    valid, _, failed = validate_tickers(TICKERS, provider=provider, batch_size=10, rate=1000, retries=2, backoff=0.001)
+    assert failed == [] and len(valid) == 40
+    assert len(provider.calls) == 6
+
+def test_validate_tickers_gives_up():
+    provider = FlakyProvider(flaky=["T010"], failures=10)
+    valid, _, failed = validate_tickers(TICKERS, provider=provider, batch_size=10, rate=1000, retries=1, backoff=0.001)
+    assert failed == TICKERS[10:20]
+    assert len(valid) == 30
+
+def test_validate_tickers_retries_empty_batches():
+    provider = FlakyProvider(flaky=["T010"], failures=1, empty=True)
+    valid, invalid, failed = validate_tickers(TICKERS, provider=provider, batch_size=10, rate=1000, retries=1,
+                                              backoff=0.001)
+    assert len(valid) == 40 and invalid == [] and failed == []
+
+    provider = FlakyProvider(flaky=["T010"], failures=10, empty=True)
+    valid, invalid, failed = validate_tickers(TICKERS, provider=provider, batch_size=10, rate=1000, retries=1,
+                                              backoff=0.001)
+    assert failed == TICKERS[10:20] and invalid == []
+
+# --- universe file tests ---
+
+def test_write_universe_and_diff(tmp_path):
+    path = tmp_path / "tickers.txt"
+    write_universe(["AAA", "BBB"], str(path))
+    assert load_valid_tickers(str(path)) == ["AAA", "BBB"]
+    write_universe(["BBB", "CCC"], str(path))
+    assert load_valid_tickers(str(path)) == ["BBB", "CCC"]
+    assert list(tmp_path.iterdir()) == [path]  # no temp files left behind
+    assert diff_universe(["AAA", "BBB"], ["BBB", "CCC"]) == (["CCC"], ["AAA"])
+
+def test_write_universe_keeps_mode(tmp_path):
+    path = tmp_path / "tickers.txt"
+    path.write_text("AAA\n")
+    os.chmod(path, 0o644)
+    write_universe(["BBB"], str(path))
+    assert os.stat(path).st_mode & 0o777 == 0o644
+
+def test_write_universe_new_file_mode(tmp_path):
+    reference = tmp_path / "reference.txt"
+    reference.write_text("")  # gets the process umask default
+    path = tmp_path / "tickers.txt"
+    write_universe(["AAA"], str(path))
+    assert os.stat(path).st_mode & 0o777 == os.stat(reference).st_mode & 0o777
+
+def test_default_universe_file_is_registry_file():
+    assert UNIVERSE_FILE == DEFAULT_TICKERS_FILE and os.path.isabs(UNIVERSE_FILE)
+
+def test_scrape_keeps_previous_status_of_failed(tmp_path, capsys):
+    path = tmp_path / "tickers.txt"
+    write_universe(TICKERS[:15] + ["OLD"], str(path))
+    provider = FlakyProvider(flaky=["T010"], failures=10, missing=["T005"])
+    result = scrape_sp500_valid_tickers(provider=provider, tickers=TICKERS, filename=str(path),
+                                        max_removed_fraction=0.2, batch_size=10, rate=1000, retries=1,
+                                        backoff=0.001)
+    universe = load_valid_tickers(str(path))
+    # T010..T014 failed but were valid before; T015..T019 failed and were not
+    assert universe == [t for t in TICKERS if t != "T005" and t not in TICKERS[15:20]]
+    assert result["removed"] == ["T005", "OLD"]
+    assert result["added"] == TICKERS[20:]
+    assert "Removed: T005, OLD" in capsys.readouterr().out
+
+def test_scrape_refuses_large_removal(tmp_path, capsys):
+    path = tmp_path / "tickers.txt"
+    write_universe(TICKERS, str(path))
+    provider = SyntheticProvider(missing=TICKERS[::3])
+    result = scrape_sp500_valid_tickers(provider=provider, tickers=TICKERS, filename=str(path),
+                                        batch_size=10, rate=1000)
+    assert result is None
+    assert load_valid_tickers(str(path)) == TICKERS
+    assert "Refusing to write" in capsys.readouterr().out
@@ -0,0 +1,116 @@
+import json
+import pytest
+import numpy as np
+import pandas as pd
+
+from app.ml.stream_profile import StreamingProfile, load_summary, profile_dataset
+
+
+@pytest.fixture
+def master_csv(make_master_csv):
+    return make_master_csv(pd.date_range("2020-01-01", periods=500), ["AAPL", "GOOG", "MSFT", "ZTS"],
+                           columns=["Date", "ticker", "Close", "return_1d", "volume_avg_10d", "macd"],
+                           scales={"return_1d": (0, 0.02), "volume_avg_10d": (5e7, 1e6)},
+                           nans={"macd": 100}, seed=1)
+
+NUMERIC = ["Close", "return_1d", "volume_avg_10d", "macd"]
+
+# --- StreamingProfile tests ---
+
+def test_profile_matches_full_load(master_csv):
+    path, df = master_csv
+    summary = profile_dataset(path, chunksize=150)
+    assert summary["rows"] == len(df)
+    for col in NUMERIC:
+        stats = summary["columns"][col]
+        assert stats["count"] == df[col].notna().sum()
+        assert stats["nulls"] == df[col].isna().sum()
+        assert stats["mean"] == pytest.approx(df[col].astype(np.float32).mean(), rel=1e-6)
+        assert stats["std"] == pytest.approx(df[col].astype(np.float32).std(), rel=1e-5)
+        assert stats["min"] == pytest.approx(df[col].min(), rel=1e-6)
+        assert stats["max"] == pytest.approx(df[col].max(), rel=1e-6)
+    corr = summary["correlation"]
+    expected = df[NUMERIC].astype(np.float32).corr()
+    np.testing.assert_allclose(pd.DataFrame(corr["matrix"], index=corr["columns"], columns=corr["columns"])
+                               .loc[NUMERIC, NUMERIC], expected, atol=1e-5)
+    assert summary["categorical"]["ticker"]["unique"] == 4
+    assert summary["categorical"]["Date"]["min"].startswith("2020-01-01")
+    assert summary["sample_series"]["ticker"] == "AAPL"
+    assert len(summary["sample_series"]["Close"]) == len(df) // 4
+
+
+def test_histogram_and_quantiles(master_csv):
+    path, df = master_csv
+    summary = profile_dataset(path, chunksize=500, bins=20, hist_ranges={"return_1d": (-0.04, 0.04)},
+                              sample_size=5000)
+    hist = summary["columns"]["return_1d"]["histogram"]
+    assert len(hist["counts"]) == 20 and hist["edges"][0] == -0.04
+    values = df["return_1d"]
+    assert hist["underflow"] == (values < -0.04).sum()
+    assert hist["overflow"] == (values > 0.04).sum()
+    assert sum(hist["counts"]) + hist["underflow"] + hist["overflow"] == len(values)
+    # The sample holds every value here, so the quantiles are exact
+    assert summary["columns"]["Close"]["quantiles"]["0.5"] == pytest.approx(df["Close"].median(), rel=1e-6)
+
+
+def test_histogram_widens_for_later_chunks():
+    # Sorted by ticker, like the master dataset: later tickers have a wider range than the first chunk
+    rng = np.random.default_rng(3)
+    values = np.concatenate([rng.uniform(-1, 1, 1000), rng.normal(0, 5, 1000), rng.uniform(40, 41, 500)])
+    profile = StreamingProfile(bins=25)
+    for chunk in np.array_split(values, 10):
+        profile.update(pd.DataFrame({"x": chunk}))
+    hist = profile.summary()["columns"]["x"]["histogram"]
+    assert len(hist["counts"]) == 25
+    assert hist["underflow"] == hist["overflow"] == 0
+    assert hist["edges"][0] <= values.min() and hist["edges"][-1] >= values.max()
+    assert hist["counts"] == np.histogram(values, bins=hist["edges"])[0].tolist()
+
+
+def test_reservoir_quantiles_are_approximate():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=50_000)
+    profile = StreamingProfile(sample_size=2000)
+    for chunk in np.array_split(values, 25):
+        profile.update(pd.DataFrame({"x": chunk}))
+    quantiles = profile.summary()["columns"]["x"]["quantiles"]
+    assert len(profile.samples[0]) == 2000
+    for q in (0.05, 0.5, 0.95):
+        assert quantiles[str(q)] == pytest.approx(np.quantile(values, q), abs=0.15)
+
+
+def test_merge_equals_single_pass(master_csv):
+    _, df = master_csv
+    ranges = {col: (df[col].min(), df[col].max()) for col in NUMERIC}
+    single = StreamingProfile(hist_ranges=ranges)
+    single.update(df)
+    left, right = StreamingProfile(hist_ranges=ranges), StreamingProfile(hist_ranges=ranges)
+    left.update(df.iloc[:700])
+    right.update(df.iloc[700:])
+    merged = left.merge(right).summary()
+    expected = single.summary()
+    for col in NUMERIC:
+        for key in ("count", "nulls", "mean", "std", "min", "max"):
+            assert merged["columns"][col][key] == pytest.approx(expected["columns"][col][key], rel=1e-9)
+        assert merged["columns"][col]["histogram"] == expected["columns"][col]["histogram"]
+    np.testing.assert_allclose(merged["correlation"]["matrix"], expected["correlation"]["matrix"], atol=1e-9)
+    assert merged["categorical"]["ticker"] == expected["categorical"]["ticker"]
+
+
+def test_merge_requires_matching_edges(master_csv):
+    _, df = master_csv
+    left, right = StreamingProfile(), StreamingProfile()
+    left.update(df.iloc[:10])
+    right.update(df.iloc[10:])
+    with pytest.raises(ValueError):
+        left.merge(right)
+
+# --- profile_dataset tests ---
+
+def test_profile_dataset_writes_summary(master_csv, tmp_path):
+    path, _ = master_csv
+    out = tmp_path / "profile.json"
+    summary = profile_dataset(path, str(out), columns=["ticker", "Close"])
+    assert load_summary(str(out)) == json.loads(json.dumps(summary))
+    assert list(summary["columns"]) == ["Close"]
+    assert summary["sample_series"] is None
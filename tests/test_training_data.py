@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+import app.ml.training_data as td
+from app.ml.training_data import FEATURES, TARGET, feature_set_hash, load_training_data, read_columns
+
+
+@pytest.fixture
+def master_csv(make_master_csv):
+    return make_master_csv(pd.date_range("2020-01-01", periods=300), ["MSFT", "AAPL", "ZTS", "GOOG"],
+                           grouped=False, nans={"rsi_14": 20, TARGET: 10})
+
+# --- read_columns tests ---
+
+def test_read_columns_projects_and_downcasts(master_csv):
+    path, _ = master_csv
+    df = read_columns(path, ["Date", "ticker", "Close"])
+    assert list(df.columns) == ["Date", "ticker", "Close"]
+    assert df["Close"].dtype == np.float32
+    assert isinstance(df["ticker"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df["Date"])
+
+# --- load_training_data tests ---
+
+def test_load_training_data(master_csv):
+    path, raw = master_csv
+    X, y = load_training_data(path)
+    expected = raw.dropna(subset=FEATURES + [TARGET])
+    assert list(X.columns) == FEATURES + ["ticker"]
+    assert len(X) == len(y) == len(expected)
+    assert (X[FEATURES].dtypes == np.float32).all() and y.dtype == np.float32
+    assert np.allclose(y.values, expected[TARGET].values)
+    # Category codes are the same as a LabelEncoder fitted on the tickers
+    assert (X["ticker"].cat.codes.values == LabelEncoder().fit_transform(expected["ticker"])).all()
+
+def test_load_training_data_drops_unused_tickers(master_csv, tmp_path):
+    _, raw = master_csv
+    # AAA sorts first and has no usable rows: it must not take a code
+    extra = raw.iloc[:5].assign(ticker="AAA", **{TARGET: np.nan})
+    path = str(tmp_path / "with_unused.csv")
+    pd.concat([extra, raw]).to_csv(path, index=False)
+    expected = raw.dropna(subset=FEATURES + [TARGET])
+    for chunksize in (None, 37):
+        X, _ = load_training_data(path, chunksize=chunksize)
+        assert list(X["ticker"].cat.categories) == sorted(expected["ticker"].unique())
+        assert (X["ticker"].cat.codes.values == LabelEncoder().fit_transform(expected["ticker"])).all()
+
+def test_load_training_data_chunked_matches(master_csv):
+    path, _ = master_csv
+    X, y = load_training_data(path)
+    Xc, yc = load_training_data(path, chunksize=37)
+    pd.testing.assert_frame_equal(X, Xc)
+    pd.testing.assert_series_equal(y, yc)
+
+def test_load_training_data_cache(master_csv, tmp_path, monkeypatch):
+    path, _ = master_csv
+    cache_dir = str(tmp_path / "cache")
+    X, y = load_training_data(path, cache_dir=cache_dir)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("source file was re-read")
+    monkeypatch.setattr(td, "read_columns", fail)
+    Xc, yc = load_training_data(path, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(X, Xc, check_categorical=False)
+    assert (X["ticker"].astype(str).values == Xc["ticker"].astype(str).values).all()
+    assert np.allclose(y.values, yc.values)
+
+def test_feature_set_hash_changes(master_csv):
+    path, _ = master_csv
+    assert feature_set_hash(path, FEATURES, TARGET) == feature_set_hash(path, FEATURES, TARGET)
+    assert feature_set_hash(path, FEATURES[:-1], TARGET) != feature_set_hash(path, FEATURES, TARGET)
+    assert feature_set_hash(path, FEATURES, TARGET, extra={"gap": 5}) != feature_set_hash(path, FEATURES, TARGET)
+    assert (feature_set_hash(path, FEATURES, TARGET, extra={"gap": 5})
+            != feature_set_hash(path, FEATURES, TARGET, extra={"gap": 10}))
+
+def test_load_training_data_parquet(master_csv, tmp_path):
+    path, raw = master_csv
+    parquet_path = str(tmp_path / "master.parquet")
+    raw.to_parquet(parquet_path, index=False)
+    X, y = load_training_data(path)
+    Xp, yp = load_training_data(parquet_path, chunksize=50)
+    pd.testing.assert_frame_equal(X, Xp, check_categorical=False)
+    assert np.allclose(y.values, yp.values)
@@ -0,0 +1,97 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from app.market_data import SyntheticProvider
+from app.risk_metrics import run_portfolio_analysis_web
+from app.universe import TickerUniverse, get_universe
+
+
+def write_tickers(path, tickers, mtime_ns=None):
+    path.write_text("".join(t + "\n" for t in tickers))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+# --- TickerUniverse tests ---
+
+def test_ids_and_membership():
+    universe = TickerUniverse(["MSFT", "AAPL", "GOOG", "AAPL"])
+    assert len(universe) == 3
+    assert list(universe.ids(["GOOG", "MSFT", "FAKE"])) == [2, 0, -1]
+    assert "AAPL" in universe and "FAKE" not in universe
+    assert universe.contains_all(["AAPL", "GOOG"])
+    assert not universe.contains_all(["AAPL", "FAKE"])
+    assert not universe.contains_all([])
+
+def test_encode_matches_label_encoder_order():
+    universe = TickerUniverse(["MSFT", "AAPL", "ZTS"], encoder_classes=["AAPL", "GOOG", "MSFT"])
+    assert list(universe.encode(["MSFT", "GOOG", "ZTS"])) == [2, 1, -1]
+    assert list(universe.encoder_codes) == [2, 0, -1]
+
+def test_column_positions():
+    universe = TickerUniverse(["MSFT", "AAPL", "GOOG"])
+    positions = universe.column_positions(["GOOG", "^GSPC", "MSFT"])
+    assert list(positions) == [2, -1, 0]
+    assert list(positions[universe.ids(["MSFT", "GOOG", "AAPL"])]) == [2, 0, -1]
+
+def test_record_availability():
+    universe = TickerUniverse(["AAPL", "MSFT"])
+    dates = pd.date_range("2024-01-01", periods=4)
+    universe.record_availability(pd.DataFrame({"AAPL": [np.nan, 1, 2, np.nan], "MSFT": [1, 2, 3, 4]}, index=dates))
+    universe.record_availability(pd.DataFrame({"AAPL": [1.0]}, index=[pd.Timestamp("2023-12-01")]))
+    info = universe.info("AAPL")
+    assert info["id"] == 0
+    assert info["first_date"] == pd.Timestamp("2023-12-01")
+    assert info["last_date"] == pd.Timestamp("2024-01-03")
+    assert universe.info("MSFT")["last_date"] == pd.Timestamp("2024-01-04")
+
+def test_record_availability_concurrent():
+    universe = TickerUniverse(["AAPL", "MSFT"])
+    frames = [pd.DataFrame({"AAPL": [1.0], "MSFT": [1.0]}, index=[pd.Timestamp("2020-01-01") + pd.Timedelta(days=i)])
+              for i in range(200)]
+    threads = [threading.Thread(target=universe.record_availability, args=(f,)) for f in frames]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for ticker in ("AAPL", "MSFT"):
+        assert universe.info(ticker)["first_date"] == pd.Timestamp("2020-01-01")
+        assert universe.info(ticker)["last_date"] == pd.Timestamp("2020-01-01") + pd.Timedelta(days=199)
+
+def test_web_analysis_records_availability():
+    universe = TickerUniverse(["AAPL", "MSFT"])
+    provider = SyntheticProvider(horizon="2024-12-31")
+    run_portfolio_analysis_web(["AAPL", "MSFT"], [0.5, 0.5], "2024-01-01", "2024-03-01", provider=provider,
+                               universe=universe)
+    assert universe.info("AAPL")["first_date"] == pd.Timestamp("2024-01-01")
+    assert universe.info("MSFT")["last_date"] == pd.Timestamp("2024-02-29")
+
+# --- get_universe tests ---
+
+def test_get_universe_cached_and_reloaded(tmp_path):
+    path = tmp_path / "tickers.txt"
+    write_tickers(path, ["AAA", "BBB"], mtime_ns=1_000_000_000)
+    first = get_universe(str(path))
+    assert get_universe(str(path)) is first
+    write_tickers(path, ["AAA", "BBB", "CCC"], mtime_ns=2_000_000_000)
+    second = get_universe(str(path))
+    assert second is not first
+    assert list(second.tickers) == ["AAA", "BBB", "CCC"]
+    assert list(first.tickers) == ["AAA", "BBB"]  # old readers keep a consistent view
+
+def test_get_universe_concurrent_first_use(tmp_path):
+    path = tmp_path / "tickers.txt"
+    write_tickers(path, ["AAA"])
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(get_universe(str(path)))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(u is seen[0] for u in seen)
+
+def test_default_universe_has_model_codes():
+    universe = get_universe()
+    assert "AAPL" in universe
+    assert universe.encode(["AAPL"])[0] >= 0
@@ -0,0 +1,99 @@
+import os
+import shutil
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.ensemble import RandomForestRegressor
+
+import app.ml.walk_forward as wf
+from app.ml.training_data import FEATURES, TARGET
+from app.ml.walk_forward import (load_fold_data, prepare_fold_data, run_walk_forward, summarize_walk_forward,
+                                 walk_forward_folds)
+
+
+@pytest.fixture
+def master_csv(make_master_csv):
+    return make_master_csv(pd.bdate_range("2020-01-01", periods=120), ["MSFT", "AAPL", "ZTS"], nans={"rsi_14": 15})
+
+# --- walk_forward_folds tests ---
+
+def test_folds_are_date_ordered_with_gap():
+    dates = np.repeat(pd.bdate_range("2021-01-01", periods=50).to_numpy(dtype="datetime64[D]"), 2)
+    folds = walk_forward_folds(dates, n_folds=4, min_train_dates=20, gap=5)
+    assert len(folds) == 4
+    assert folds[0]["test_start"] == 40 and folds[-1]["test_end"] == 100
+    for prev, fold in zip(folds, folds[1:]):
+        assert fold["test_start"] == prev["test_end"]
+        assert fold["train_end"] > prev["train_end"]
+    for fold in folds:
+        train_dates, test_dates = np.unique(dates[:fold["train_end"]]), np.unique(dates[fold["test_start"]:fold["test_end"]])
+        # exactly `gap` dates between the last training date and the first test date are left out
+        gap_dates = np.unique(dates[fold["train_end"]:fold["test_start"]])
+        assert train_dates.max() < gap_dates.min() and len(gap_dates) == 5
+        assert gap_dates.max() < test_dates.min()
+
+
+def test_folds_need_enough_dates():
+    dates = pd.bdate_range("2021-01-01", periods=10).to_numpy(dtype="datetime64[D]")
+    with pytest.raises(ValueError):
+        walk_forward_folds(dates, n_folds=5, min_train_dates=0.5, gap=10)
+
+# --- prepare_fold_data tests ---
+
+def test_prepare_fold_data_sorts_and_caches(master_csv, tmp_path, monkeypatch):
+    path, df = master_csv
+    fold_dir = prepare_fold_data(path, cache_dir=str(tmp_path / "cache"), n_folds=3, gap=10)
+    X, y, columns, folds = load_fold_data(fold_dir)
+    assert isinstance(X, np.memmap) and X.dtype == np.float32
+    assert columns == FEATURES + ["ticker_encoded"]
+    assert len(y) == len(df.dropna(subset=FEATURES + [TARGET]))
+    dates = np.load(os.path.join(fold_dir, "dates.npy"))
+    assert (np.diff(dates.astype(np.int64)) >= 0).all()
+    assert set(np.unique(X[:, -1])) == {0, 1, 2}
+    assert len(folds) == 3
+
+    # Cached: the source is not read again
+    monkeypatch.setattr(wf, "iter_columns", lambda *a, **k: pytest.fail("fold data was rebuilt"))
+    assert prepare_fold_data(path, cache_dir=str(tmp_path / "cache"), n_folds=3, gap=10) == fold_dir
+
+
+def test_prepare_fold_data_lost_race_is_cache_hit(master_csv, tmp_path, monkeypatch):
+    path, _ = master_csv
+    cache_dir = str(tmp_path / "cache")
+    fold_dir = prepare_fold_data(path, cache_dir=cache_dir, n_folds=3)
+    other = str(tmp_path / "other")
+    os.rename(fold_dir, other)
+    iter_columns = wf.iter_columns
+
+    def racing_iter_columns(*args, **kwargs):
+        # Another run publishes the same key while this one is still building
+        if not os.path.exists(fold_dir):
+            shutil.copytree(other, fold_dir)
+        return iter_columns(*args, **kwargs)
+    monkeypatch.setattr(wf, "iter_columns", racing_iter_columns)
+    assert prepare_fold_data(path, cache_dir=cache_dir, n_folds=3) == fold_dir
+    assert os.listdir(cache_dir) == [os.path.basename(fold_dir)]
+    assert load_fold_data(fold_dir)[3] == load_fold_data(other)[3]
+
+# --- run_walk_forward tests ---
+
+def test_run_walk_forward_in_process_pool(master_csv, tmp_path):
+    path, _ = master_csv
+    candidates = {
+        "linear": (LinearRegression(), FEATURES),
+        "forest": (RandomForestRegressor(n_estimators=5, random_state=0, n_jobs=-1), FEATURES + ["ticker_encoded"]),
+    }
+    report, importances = run_walk_forward(path, candidates, cache_dir=str(tmp_path / "cache"), n_folds=3,
+                                           max_workers=2)
+    assert len(report) == 6
+    assert set(report["model"]) == {"linear", "forest"}
+    assert (report["n_train"] > 0).all() and (report["predict_rows_per_sec"] > 0).all()
+    assert (report["test_first_date"] > report["train_last_date"]).all()
+    assert report.loc[report["model"] == "linear", "r2"].min() > 0.5
+    assert list(importances.index.get_level_values(0).unique()) == ["forest"]
+
+    serial, _ = run_walk_forward(path, candidates, cache_dir=str(tmp_path / "cache"), n_folds=3, max_workers=1)
+    pd.testing.assert_frame_equal(report[["model", "fold", "rmse", "r2"]], serial[["model", "fold", "rmse", "r2"]])
+    summary = summarize_walk_forward(report)
+    assert list(summary.index) == ["linear", "forest"]